@@ -0,0 +1,100 @@
+"""Reverse permission index: the files and folders each user can access, with their role"""
+from models import db, QuipMigrationFile, QuipMigrationFolder, DocumentAccess, FILE_SUMMARY_COLUMNS, FOLDER_SUMMARY_COLUMNS
+
+# File roles from strongest to weakest; a user listed under several keeps the strongest
+FILE_ROLES = ['owner', 'editor', 'commenter', 'viewer']
+FOLDER_ROLES = ['member']
+
+BUILD_SQL = '''
+    INSERT INTO quip_document_access (user_id, document_kind, document_id, quip_id, role)
+    SELECT DISTINCT ON (member.user_id, file.quip_migration_file_id)
+        member.user_id, 'file', file.quip_migration_file_id, file.quip_id, member.role
+    FROM quip_migration_files AS file
+    CROSS JOIN LATERAL (
+        SELECT unnest(file.owners), 'owner', 1
+        UNION ALL SELECT unnest(file.editors), 'editor', 2
+        UNION ALL SELECT unnest(file.commenters), 'commenter', 3
+        UNION ALL SELECT unnest(file.viewers), 'viewer', 4
+    ) AS member (user_id, role, strength)
+    WHERE member.user_id IS NOT NULL
+    ORDER BY member.user_id, file.quip_migration_file_id, member.strength;
+    
+    INSERT INTO quip_document_access (user_id, document_kind, document_id, quip_id, role)
+    SELECT DISTINCT member.user_id, 'folder', folder.quip_migration_folder_id, folder.quip_id, 'member'
+    FROM quip_migration_folders AS folder
+    CROSS JOIN unnest(folder.member_ids) AS member (user_id)
+    WHERE member.user_id IS NOT NULL;
+'''
+
+def is_supported():
+    """The index is built with PostgreSQL array functions"""
+    return db.engine.dialect.name == 'postgresql'
+
+def rebuild_access_index():
+    """Recompute the access table from the imported permission arrays, returning row counts"""
+    if not is_supported():
+        return None
+    
+    inspector = db.inspect(db.engine)
+    if not inspector.has_table(QuipMigrationFolder.__tablename__) or not inspector.has_table(QuipMigrationFile.__tablename__):
+        return None
+    
+    DocumentAccess.__table__.create(db.engine, checkfirst=True)
+    access_indexes = sorted(DocumentAccess.__table__.indexes, key=lambda index: index.name)
+    
+    with db.engine.begin() as connection:
+        # Refill without the secondary index and build it once at the end
+        connection.execute(db.text(f'TRUNCATE {DocumentAccess.__tablename__}'))
+        for index in access_indexes:
+            connection.execute(db.text(f'DROP INDEX IF EXISTS {index.name}'))
+        
+        connection.execute(db.text(BUILD_SQL))
+        
+        for index in access_indexes:
+            index.create(connection)
+        connection.execute(db.text(f'ANALYZE {DocumentAccess.__tablename__}'))
+        
+        counts = dict(connection.execute(
+            db.select(DocumentAccess.document_kind, db.func.count())
+            .group_by(DocumentAccess.document_kind)
+        ).all())
+    
+    return {'file_grants': counts.get('file', 0), 'folder_grants': counts.get('folder', 0)}
+
+def user_documents_statement(user_id, kind, limit, after=None, role=None):
+    """A user's files or folders with their role in (quip_id, id) order, seeking past after=(quip_id, id)"""
+    access = DocumentAccess
+    if kind == 'file':
+        model, id_column, columns = QuipMigrationFile, QuipMigrationFile.quip_migration_file_id, FILE_SUMMARY_COLUMNS
+    else:
+        model, id_column, columns = QuipMigrationFolder, QuipMigrationFolder.quip_migration_folder_id, FOLDER_SUMMARY_COLUMNS
+    
+    statement = db.select(
+        access.role,
+        *columns
+    ).join(
+        model, id_column == access.document_id
+    ).where(
+        access.user_id == user_id,
+        access.document_kind == kind
+    )
+    
+    if role:
+        statement = statement.where(access.role == role)
+    if after:
+        statement = statement.where(db.tuple_(access.quip_id, access.document_id) > db.tuple_(*after))
+    
+    return statement.order_by(access.quip_id, access.document_id).limit(limit)
+
+def role_counts(user_id):
+    """Count a user's grants per document kind and role"""
+    rows = db.session.execute(
+        db.select(DocumentAccess.document_kind, DocumentAccess.role, db.func.count())
+        .where(DocumentAccess.user_id == user_id)
+        .group_by(DocumentAccess.document_kind, DocumentAccess.role)
+    ).all()
+    
+    counts = {'file': {}, 'folder': {}}
+    for kind, role, count in rows:
+        counts[kind][role] = count
+    return counts
@@ -0,0 +1,163 @@
+"""Offline restore of every file matching a filter into a directory, resumable from a checkpoint file"""
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from bulk_restore import restore_document_job
+from converters import sanitize_filename
+from models import db, QuipMigrationFile
+import folder_tree
+
+# Timestamp column each --date-field value filters on
+DATE_FIELDS = {
+    'created': QuipMigrationFile.when_quip_created,
+    'edited': QuipMigrationFile.when_quip_last_edited,
+    'migrated': QuipMigrationFile.when_migration_completed
+}
+
+CHECKPOINT_FILENAME = '.restore-checkpoint'
+
+# Files whose HTML is loaded per query, once the checkpoint has ruled out the ones already restored
+CONTENT_BATCH_SIZE = 50
+
+def matching_files_statement(folder_id=None, author=None, since=None, until=None, date_field='created'):
+    """Select (quip_migration_file_id, quip_id, name) of the files matching every given filter, in primary key order
+    
+    folder_id is a quip_migration_folder_id and includes its subfolders;
+    since is inclusive and until exclusive. The HTML is left out, so files
+    already restored by a previous run cost no more than their ids.
+    """
+    statement = db.select(
+        QuipMigrationFile.quip_migration_file_id,
+        QuipMigrationFile.quip_id,
+        QuipMigrationFile.obfuscated_name
+    )
+    
+    if folder_id is not None:
+        files_under = folder_tree.files_under_statement(folder_id, None).subquery()
+        statement = statement.where(
+            QuipMigrationFile.quip_migration_file_id.in_(db.select(files_under.c.quip_migration_file_id))
+        )
+    if author:
+        statement = statement.where(QuipMigrationFile.author == author)
+    if since:
+        statement = statement.where(DATE_FIELDS[date_field] >= since)
+    if until:
+        statement = statement.where(DATE_FIELDS[date_field] < until)
+    
+    return statement.order_by(QuipMigrationFile.quip_migration_file_id)
+
+def load_contents(file_ids):
+    """Return {quip_migration_file_id: html_content} for a batch of files"""
+    rows = db.session.execute(
+        db.select(QuipMigrationFile.quip_migration_file_id, QuipMigrationFile.html_content).where(
+            QuipMigrationFile.quip_migration_file_id.in_(file_ids)
+        )
+    )
+    return dict(rows.all())
+
+def read_checkpoint(path):
+    """Return the quip_ids a previous run already restored"""
+    if not os.path.exists(path):
+        return set()
+    
+    with open(path, encoding='utf-8') as checkpoint:
+        return {line.strip() for line in checkpoint if line.strip()}
+
+def output_filename(title, name, quip_id, output_format):
+    """Name restored files by title and quip_id, so names never collide and stay the same across resumed runs"""
+    base_name = sanitize_filename(title or name or '') or 'quip_document'
+    return f'{base_name} ({quip_id}).{output_format}'
+
+def _write_atomically(path, content):
+    # A run killed mid-write leaves a .partial file rather than a truncated document
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.partial')
+    try:
+        with os.fdopen(fd, 'wb') as temp_file:
+            temp_file.write(content)
+        os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def restore_to_directory(files, output_dir, output_format, workers, timeout, checkpoint_path=None, prepare_html=None, on_progress=None):
+    """Clean and convert (quip_migration_file_id, quip_id, name) files in a process pool into output_dir
+    
+    Each restored quip_id is appended to the checkpoint file once its output
+    is on disk, and files listed there are skipped before their HTML is
+    loaded, so rerunning after an interruption resumes where it stopped.
+    prepare_html(html) runs in this process before a document is sent to a
+    worker. on_progress(summary) is called after each finished document.
+    Returns the summary counts.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    checkpoint_path = checkpoint_path or os.path.join(output_dir, CHECKPOINT_FILENAME)
+    done = read_checkpoint(checkpoint_path)
+    
+    summary = {'restored': 0, 'failed': 0, 'skipped': 0, 'empty': 0, 'errors': [], 'elapsed': 0.0}
+    started_at = time.perf_counter()
+    
+    def with_contents(batch):
+        contents = load_contents([file_id for file_id, _, _ in batch])
+        for file_id, quip_id, name in batch:
+            yield quip_id, name, contents.get(file_id)
+    
+    def documents():
+        batch = []
+        for file_id, quip_id, name in files:
+            if quip_id in done:
+                summary['skipped'] += 1
+                continue
+            batch.append((file_id, quip_id, name))
+            if len(batch) >= CONTENT_BATCH_SIZE:
+                yield from with_contents(batch)
+                batch = []
+        if batch:
+            yield from with_contents(batch)
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor, open(checkpoint_path, 'a', encoding='utf-8') as checkpoint:
+        remaining = documents()
+        pending = {}
+        
+        def submit_next():
+            for quip_id, name, html_content in remaining:
+                if not html_content:
+                    summary['empty'] += 1
+                    continue
+                
+                if prepare_html:
+                    html_content = prepare_html(html_content)
+                future = executor.submit(restore_document_job, html_content, output_format, timeout)
+                pending[future] = (quip_id, name)
+                return True
+            return False
+        
+        # At most twice the number of workers documents are loaded and in flight
+        while len(pending) < workers * 2 and submit_next():
+            pass
+        
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            
+            for future in finished:
+                quip_id, name = pending.pop(future)
+                try:
+                    title, content, _ = future.result()
+                    _write_atomically(os.path.join(output_dir, output_filename(title, name, quip_id, output_format)), content)
+                except Exception as e:
+                    # Failures are not checkpointed, so the next run retries them
+                    summary['failed'] += 1
+                    summary['errors'].append((quip_id, str(e)))
+                else:
+                    checkpoint.write(quip_id + '\n')
+                    checkpoint.flush()
+                    summary['restored'] += 1
+                
+                summary['elapsed'] = time.perf_counter() - started_at
+                if on_progress:
+                    on_progress(summary)
+                submit_next()
+    
+    summary['elapsed'] = time.perf_counter() - started_at
+    return summary
@@ -0,0 +1,126 @@
+"""Benchmark the single-pass lxml cleaner against the original BeautifulSoup pipeline
+
+Usage:
+    python benchmarks/bench_html_cleaning.py [--size-kb 2048] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from html_cleaner import clean_quip_document
+
+def legacy_clean_quip_html(html_content):
+    """The original html.parser based clean_quip_html"""
+    soup = BeautifulSoup(html_content, 'html.parser')
+    
+    for script in soup(["script", "style"]):
+        script.decompose()
+    
+    for tag in soup.find_all(True):
+        if tag.get('class'):
+            tag['class'] = [cls for cls in tag['class'] if not cls.startswith('quip-')]
+            if not tag['class']:
+                del tag['class']
+        
+        quip_attrs = [attr for attr in tag.attrs.keys() if attr.startswith('data-quip-')]
+        for attr in quip_attrs:
+            del tag[attr]
+    
+    cleaned_html = str(soup)
+    cleaned_html = re.sub(r'\s+', ' ', cleaned_html)
+    cleaned_html = re.sub(r'>\s+<', '><', cleaned_html)
+    return cleaned_html
+
+def legacy_extract_title_from_html(html_content):
+    """The original html.parser based extract_title_from_html"""
+    soup = BeautifulSoup(html_content, 'html.parser')
+    
+    h1 = soup.find('h1')
+    if h1:
+        return h1.get_text().strip()
+    
+    title = soup.find('title')
+    if title:
+        return title.get_text().strip()
+    
+    for i in range(1, 7):
+        heading = soup.find(f'h{i}')
+        if heading:
+            return heading.get_text().strip()
+    
+    return None
+
+def generate_quip_html(size_kb, seed=0):
+    """Build a Quip-like document of roughly size_kb kilobytes"""
+    rng = random.Random(seed)
+    words = ['migration', 'quip', 'drive', 'restore', 'document', 'folder', 'owner', 'review', 'draft', 'plan']
+    parts = [
+        '<html><head><title>Benchmark document</title><style>.quip-x { color: red; }</style></head><body>',
+        '<h1 class="quip-heading section-title" data-quip-id="h1">  Quarterly   migration plan  </h1>\n'
+    ]
+    size = sum(len(part) for part in parts)
+    index = 0
+    
+    while size < size_kb * 1024:
+        sentence = ' '.join(rng.choice(words) for _ in range(rng.randint(8, 30)))
+        if index % 10 == 0:
+            block = f'<h2 class="quip-heading" data-quip-section="{index}">Section {index}</h2>\n'
+        elif index % 7 == 0:
+            cells = ''.join(f'<td class="quip-cell" data-quip-col="{col}">  {sentence[:40]}  </td>' for col in range(4))
+            block = f'<table class="quip-table"><tr data-quip-row="{index}">{cells}</tr></table>\n'
+        elif index % 5 == 0:
+            items = ''.join(f'<li class="quip-list-item">{sentence[:60]}</li>\n' for _ in range(3))
+            block = f'<ul class="quip-list checklist">{items}</ul>\n'
+        else:
+            block = f'<p class="quip-paragraph body" data-quip-id="p{index}">  {sentence}\n  <a href="https://quip.com/{index}">link</a>  </p>\n'
+        parts.append(block)
+        size += len(block)
+        index += 1
+    
+    parts.append('<script>console.log("quip");</script></body></html>')
+    return ''.join(parts)
+
+def best_of(repeat, func):
+    """Return the fastest of repeat runs of func() in seconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-kb', type=int, nargs='+', default=[100, 1024, 4096], help='Document sizes to benchmark')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement (best is reported)')
+    args = parser.parse_args()
+    
+    print(f"{'size':>10} {'legacy (s)':>12} {'lxml (s)':>10} {'speedup':>8}  title")
+    for size_kb in args.size_kb:
+        html_content = generate_quip_html(size_kb)
+        
+        def legacy():
+            cleaned_html = legacy_clean_quip_html(html_content)
+            return cleaned_html, legacy_extract_title_from_html(cleaned_html)
+        
+        def single_pass():
+            return clean_quip_document(html_content)
+        
+        # Both pipelines must agree on the title before timing them
+        legacy_title = legacy()[1]
+        title = single_pass()[1]
+        if legacy_title != title:
+            raise SystemExit(f'Title mismatch: legacy={legacy_title!r} lxml={title!r}')
+        
+        legacy_seconds = best_of(args.repeat, legacy)
+        lxml_seconds = best_of(args.repeat, single_pass)
+        print(f"{size_kb:>8}KB {legacy_seconds:>12.3f} {lxml_seconds:>10.3f} {legacy_seconds / lxml_seconds:>7.1f}x  {title}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""Benchmark the Core row serializer against the original ORM objects + jsonify responses
+
+Usage:
+    DATABASE_URL=postgresql://localhost/quip_bench python benchmarks/bench_serialization.py [--rows 1000] [--repeat 20]
+
+Each page is loaded and encoded both ways against the same database (see
+generate_data.py), reporting the best time and the peak memory allocated.
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import json, jsonify
+from models import db, QuipMigrationFile, QuipMigrationFolder, FILE_SUMMARY_COLUMNS, FOLDER_SUMMARY_COLUMNS
+import serializers
+
+def legacy_google_drive_files(rows):
+    """The original /api/google-drive-files page: ORM objects, per-field isoformat and jsonify"""
+    files = QuipMigrationFile.query.options(
+        db.load_only(*FILE_SUMMARY_COLUMNS)
+    ).filter(
+        QuipMigrationFile.google_drive_id.isnot(None)
+    ).order_by(QuipMigrationFile.quip_id).limit(rows).all()
+    
+    return jsonify({
+        'status': 'success',
+        'files': [
+            {
+                'id': file.quip_migration_file_id,
+                'quip_document_id': file.quip_id,
+                'google_drive_file_id': file.google_drive_id,
+                'google_drive_file_name': file.obfuscated_name,
+                'google_drive_file_url': f"https://docs.google.com/document/d/{file.google_drive_id}/edit",
+                'document_type': file.document_type,
+                'author': file.author,
+                'when_quip_created': file.when_quip_created.isoformat() if file.when_quip_created else None,
+                'when_migration_completed': file.when_migration_completed.isoformat() if file.when_migration_completed else None
+            }
+            for file in files
+        ]
+    }).get_data()
+
+def fast_google_drive_files(rows):
+    statement = serializers.select_fields(serializers.GOOGLE_DRIVE_FILE_FIELDS).where(
+        QuipMigrationFile.google_drive_id.isnot(None)
+    ).order_by(QuipMigrationFile.quip_id).limit(rows)
+    
+    files = serializers.rows_to_dicts(db.session.execute(statement))
+    return serializers.json_response({'status': 'success', 'files': files}).get_data()
+
+def legacy_documents(rows):
+    """The original /api/documents page: files and folders as ORM objects"""
+    files = QuipMigrationFile.query.options(db.load_only(*FILE_SUMMARY_COLUMNS)).limit(rows).all()
+    folders = QuipMigrationFolder.query.options(
+        db.load_only(*FOLDER_SUMMARY_COLUMNS, QuipMigrationFolder.member_ids)
+    ).limit(rows).all()
+    
+    return jsonify({
+        'status': 'success',
+        'files': [
+            {
+                'quip_migration_file_id': file.quip_migration_file_id,
+                'quip_id': file.quip_id,
+                'obfuscated_name': file.obfuscated_name,
+                'google_drive_id': file.google_drive_id,
+                'document_type': file.document_type,
+                'author': file.author,
+                'when_quip_created': file.when_quip_created.isoformat() if file.when_quip_created else None,
+                'when_migration_completed': file.when_migration_completed.isoformat() if file.when_migration_completed else None
+            }
+            for file in files
+        ],
+        'folders': [
+            {
+                'quip_migration_folder_id': folder.quip_migration_folder_id,
+                'quip_id': folder.quip_id,
+                'obfuscated_name': folder.obfuscated_name,
+                'google_drive_id': folder.google_drive_id,
+                'parent_folder': folder.parent_folder,
+                'inherit_mode': folder.inherit_mode,
+                'member_count': len(folder.member_ids) if folder.member_ids else 0
+            }
+            for folder in folders
+        ]
+    }).get_data()
+
+def fast_documents(rows):
+    files = serializers.rows_to_dicts(db.session.execute(
+        serializers.select_fields(serializers.DOCUMENT_FILE_FIELDS).limit(rows)
+    ))
+    folders = serializers.rows_to_dicts(db.session.execute(
+        serializers.select_fields(serializers.DOCUMENT_FOLDER_FIELDS).limit(rows)
+    ))
+    return serializers.json_response({'status': 'success', 'files': files, 'folders': folders}).get_data()
+
+def best_of(repeat, func):
+    """Return the fastest of repeat runs, clearing the session so ORM objects are rebuilt every time"""
+    timings = []
+    for _ in range(repeat):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def peak_allocated(func):
+    """Return the peak bytes allocated by Python while func runs"""
+    db.session.expunge_all()
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000, help='Rows per page')
+    parser.add_argument('--repeat', type=int, default=20, help='Runs per measurement (best is reported)')
+    args = parser.parse_args()
+    
+    # Imported here so the app reads DATABASE_URL from the environment set by the caller
+    from app import app
+    
+    print(f"serializer: {'orjson' if serializers.orjson else 'json'}, {args.rows} rows per page")
+    print(f"{'endpoint':<22} {'legacy (ms)':>12} {'fast (ms)':>10} {'speedup':>8} {'legacy peak':>12} {'fast peak':>10}")
+    
+    with app.test_request_context():
+        for name, legacy, fast in [
+            ('/api/google-drive-files', legacy_google_drive_files, fast_google_drive_files),
+            ('/api/documents', legacy_documents, fast_documents),
+        ]:
+            # Both must produce the same document before timing them
+            if json.loads(legacy(args.rows)) != json.loads(fast(args.rows)):
+                raise SystemExit(f'Output mismatch for {name}')
+            
+            legacy_seconds = best_of(args.repeat, lambda: legacy(args.rows))
+            fast_seconds = best_of(args.repeat, lambda: fast(args.rows))
+            legacy_peak = peak_allocated(lambda: legacy(args.rows))
+            fast_peak = peak_allocated(lambda: fast(args.rows))
+            print(
+                f"{name:<22} {legacy_seconds * 1000:>12.1f} {fast_seconds * 1000:>10.1f} {legacy_seconds / fast_seconds:>7.1f}x "
+                f"{legacy_peak / 1024:>10.0f}KB {fast_peak / 1024:>8.0f}KB"
+            )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""Fill the migration tables with synthetic files, nested folders and permissions for benchmarking
+
+Usage:
+    DATABASE_URL=postgresql://localhost/quip_bench python benchmarks/generate_data.py [--files 100000] [--folders 2000] [--html-kb 8]
+
+The rows are streamed in with COPY, then the same post-import step as
+/api/import-dump builds the indexes, folder tree, access index and
+search vectors. Pass --truncate to replace existing data.
+"""
+import argparse
+import io
+import os
+import random
+import string
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_html_cleaning import generate_quip_html
+from models import db, QuipMigrationFile, QuipMigrationFolder
+
+# Vocabulary for document names, so full-text search has selective and common terms
+NAME_WORDS = [
+    'roadmap', 'quarterly', 'planning', 'budget', 'hiring', 'review', 'launch', 'retro', 'design', 'spec',
+    'onboarding', 'offsite', 'metrics', 'incident', 'postmortem', 'customer', 'feedback', 'pricing', 'security', 'audit',
+    'marketing', 'sales', 'engineering', 'support', 'legal', 'finance', 'partner', 'research', 'interview', 'notes'
+]
+DOCUMENT_TYPES = ['DOCUMENT', 'DOCUMENT', 'DOCUMENT', 'SPREADSHEET', 'SLIDES', 'CHAT']
+QUIP_ID_CHARS = string.ascii_letters + string.digits
+DRIVE_ID_CHARS = string.ascii_letters + string.digits + '-_'
+
+# Distinct HTML bodies generated per size; documents reuse them so generation stays fast
+HTML_VARIANTS = 50
+
+def copy_value(value):
+    """Format one value for COPY ... FROM STDIN in text format"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, list):
+        return '{' + ','.join('"' + item.replace('\\', '\\\\').replace('"', '\\"') + '"' for item in value) + '}'
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+def copy_rows(cursor, table, columns, rows, batch_size=5000):
+    """Stream rows into a table with COPY in batches of batch_size"""
+    buffer = io.StringIO()
+    count = 0
+    
+    def flush():
+        buffer.seek(0)
+        cursor.copy_expert(f'COPY {table} ({", ".join(columns)}) FROM STDIN', buffer)
+        buffer.seek(0)
+        buffer.truncate()
+    
+    for row in rows:
+        buffer.write('\t'.join(copy_value(value) for value in row) + '\n')
+        count += 1
+        if count % batch_size == 0:
+            flush()
+    flush()
+    return count
+
+def random_id(rng, length, chars=QUIP_ID_CHARS):
+    return ''.join(rng.choice(chars) for _ in range(length))
+
+def generate_folders(rng, count, max_depth):
+    """Yield (id, quip_id, parent quip_id) for a random forest no deeper than max_depth"""
+    depths = []
+    quip_ids = []
+    
+    for index in range(count):
+        # Roughly one folder in ten is a root; the rest hang under an earlier folder
+        parent = None
+        if index and rng.random() > 0.1:
+            candidate = rng.randrange(index)
+            if depths[candidate] < max_depth - 1:
+                parent = candidate
+        
+        depths.append(depths[parent] + 1 if parent is not None else 0)
+        quip_ids.append(random_id(rng, 12))
+        yield index + 1, quip_ids[index], quip_ids[parent] if parent is not None else None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=100000, help='Number of files')
+    parser.add_argument('--folders', type=int, default=2000, help='Number of folders')
+    parser.add_argument('--max-depth', type=int, default=6, help='Deepest folder nesting')
+    parser.add_argument('--users', type=int, default=5000, help='Distinct users in the permission arrays')
+    parser.add_argument('--html-kb', type=int, default=8, help='Approximate size of each document')
+    parser.add_argument('--migrated', type=float, default=0.8, help='Share of files with a google_drive_id')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed, so runs are repeatable')
+    parser.add_argument('--truncate', action='store_true', help='Delete existing files and folders first')
+    args = parser.parse_args()
+    
+    # Imported here so the app reads DATABASE_URL from the environment set by the caller
+    from app import app, after_dump_import
+    
+    rng = random.Random(args.seed)
+    users = [f'user{index:06d}' for index in range(args.users)]
+    html_variants = [generate_quip_html(args.html_kb, seed) for seed in range(HTML_VARIANTS)]
+    now = datetime.utcnow()
+    
+    with app.app_context():
+        db.create_all()
+        
+        connection = db.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            if args.truncate:
+                cursor.execute(f'TRUNCATE {QuipMigrationFile.__tablename__}, {QuipMigrationFolder.__tablename__}')
+            
+            start = time.perf_counter()
+            folders = list(generate_folders(rng, args.folders, args.max_depth))
+            folder_rows = (
+                (
+                    folder_id, quip_id, random_id(rng, 33, DRIVE_ID_CHARS), f'{" ".join(rng.sample(NAME_WORDS, 2)).title()} {folder_id}',
+                    now - timedelta(days=rng.randint(0, 30)), parent, rng.sample(users, rng.randint(1, 20)),
+                    'inherit', now - timedelta(minutes=rng.randint(0, 60 * 24 * 90))
+                )
+                for folder_id, quip_id, parent in folders
+            )
+            folder_count = copy_rows(cursor, QuipMigrationFolder.__tablename__, [
+                'quip_migration_folder_id', 'quip_id', 'google_drive_id', 'obfuscated_name',
+                'when_migration_completed', 'parent_folder', 'member_ids', 'inherit_mode', 'when_updated'
+            ], folder_rows)
+            
+            def file_rows():
+                for file_id in range(1, args.files + 1):
+                    created = now - timedelta(days=rng.randint(30, 3650))
+                    migrated = rng.random() < args.migrated
+                    parents = [rng.choice(folders)[1] for _ in range(1 if rng.random() < 0.9 else 2)] if folders else []
+                    people = rng.sample(users, min(len(users), rng.randint(2, 12)))
+                    name = ' '.join(rng.sample(NAME_WORDS, rng.randint(2, 4))).capitalize()
+                    
+                    yield (
+                        file_id, random_id(rng, 12), f'/{random_id(rng, 12)}',
+                        random_id(rng, 44, DRIVE_ID_CHARS) if migrated else None,
+                        f'{name} {file_id}',
+                        now - timedelta(days=rng.randint(0, 30)) if migrated else None,
+                        None, created + timedelta(days=rng.randint(0, 30)), created,
+                        parents, rng.choice(DOCUMENT_TYPES), rng.choice(html_variants), people[0],
+                        people[:1], people[1:3], people[3:5], people[5:],
+                        now - timedelta(minutes=rng.randint(0, 60 * 24 * 90))
+                    )
+            
+            file_count = copy_rows(cursor, QuipMigrationFile.__tablename__, [
+                'quip_migration_file_id', 'quip_id', 'quip_secret_path', 'google_drive_id', 'obfuscated_name',
+                'when_migration_completed', 'when_links_fixed', 'when_quip_last_edited', 'when_quip_created',
+                'parent_folders', 'document_type', 'html_content', 'author',
+                'owners', 'editors', 'commenters', 'viewers', 'when_updated'
+            ], file_rows())
+            
+            connection.commit()
+            print(f'Loaded {file_count:,} files and {folder_count:,} folders in {time.perf_counter() - start:.1f}s')
+        finally:
+            connection.close()
+        
+        # Same indexes, folder tree, access index and caches as after a dump import
+        start = time.perf_counter()
+        result = after_dump_import()
+        print(f'Post-import step finished in {time.perf_counter() - start:.1f}s: {result}')
+
+if __name__ == '__main__':
+    main()
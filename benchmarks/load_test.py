@@ -0,0 +1,182 @@
+"""Repeatable load test of the list, search, stats and restore endpoints against a running server
+
+Usage:
+    python benchmarks/load_test.py [--base-url http://localhost:5003] [--requests 500] [--concurrency 8]
+
+Load a dataset first (see generate_data.py) and start the app against the
+same database. Each scenario reports throughput and p50/p95/p99 latency;
+--json writes the results for comparing runs.
+"""
+import argparse
+import base64
+import json
+import random
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# Terms from generate_data.NAME_WORDS, so full-text searches have matches
+SEARCH_TERMS = ['roadmap', 'budget', 'incident', 'customer feedback', 'security audit', 'quarterly planning']
+
+def request(base_url, method, path, body=None, headers=None):
+    """Send one request and return (status, seconds), reading the whole response body"""
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    req = urllib.request.Request(
+        base_url + path, data=data, method=method, headers={'Content-Type': 'application/json', **(headers or {})}
+    )
+    
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=120) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        status = e.code
+    return status, time.perf_counter() - start
+
+def get_etag(base_url, path):
+    """Return the ETag a GET of path is served with, or None"""
+    with urllib.request.urlopen(base_url + path, timeout=120) as response:
+        response.read()
+        return response.headers.get('ETag')
+
+def get_json(base_url, path):
+    with urllib.request.urlopen(base_url + path, timeout=120) as response:
+        return json.loads(response.read())
+
+def encode_cursor(quip_id, row_id):
+    """Build a keyset cursor the same way as app.encode_cursor"""
+    raw = json.dumps([quip_id, row_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def sample_files(base_url, rng, samples, per_page):
+    """Collect file rows from random pages, so lookups are spread over the whole table"""
+    first = get_json(base_url, f'/api/google-drive-files?per_page={per_page}')
+    pages = max(first['pages'], 1)
+    
+    files = list(first['files'])
+    for _ in range(samples - 1):
+        files.extend(get_json(base_url, f'/api/google-drive-files?per_page={per_page}&page={rng.randint(1, pages)}')['files'])
+    return files, pages
+
+def build_scenarios(args, rng, files, pages):
+    """Map each scenario name to a function returning the next (method, path, body[, headers])"""
+    deep_pages = range(max(1, int(pages * 0.9)), pages + 1)
+    
+    def files_offset_deep():
+        # OFFSET pages near the end of the list are the slowest to reach
+        return 'GET', f'/api/google-drive-files?per_page={args.per_page}&page={rng.choice(deep_pages)}', None
+    
+    def files_cursor_deep():
+        file = rng.choice(files)
+        cursor = encode_cursor(file['quip_document_id'], file['id'])
+        return 'GET', f'/api/google-drive-files?per_page={args.per_page}&count=none&cursor={cursor}', None
+    
+    def search():
+        file = rng.choice(files)
+        if rng.random() < 0.5:
+            return 'GET', f'/api/search?search_type=quip&document_id={file["quip_document_id"]}', None
+        return 'GET', f'/api/search?search_type=google&document_id={file["google_drive_file_id"]}', None
+    
+    def search_text():
+        return 'GET', f'/api/search/text?q={urllib.parse.quote(rng.choice(SEARCH_TERMS))}', None
+    
+    def stats():
+        return 'GET', '/api/stats', None
+    
+    def restore_path():
+        query = urllib.parse.urlencode({'document_id': rng.choice(files)['quip_document_id'], 'format': args.restore_format})
+        return f'/api/restore-file?{query}'
+    
+    def restore():
+        return 'GET', restore_path(), None
+    
+    etags = {}
+    
+    def restore_revalidate():
+        # A browser revalidating its cached copy: the server answers 304 without loading or converting
+        path = restore_path()
+        if path not in etags:
+            etags[path] = get_etag(args.base_url, path)
+        return 'GET', path, None, {'If-None-Match': etags[path]} if etags[path] else None
+    
+    return {
+        'files-offset-deep': files_offset_deep,
+        'files-cursor-deep': files_cursor_deep,
+        'search': search,
+        'search-text': search_text,
+        'stats': stats,
+        'restore': restore,
+        'restore-revalidate': restore_revalidate,
+    }
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+def run_scenario(base_url, next_request, requests, concurrency, warmup):
+    """Send requests through concurrency workers and summarize the latencies"""
+    for _ in range(warmup):
+        request(base_url, *next_request())
+    
+    # Requests are drawn up front so the random sequence does not depend on thread scheduling
+    planned = [next_request() for _ in range(requests)]
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda planned_request: request(base_url, *planned_request), planned))
+    elapsed = time.perf_counter() - start
+    
+    latencies = sorted(seconds for _, seconds in results)
+    return {
+        'requests': requests,
+        'errors': sum(1 for status, _ in results if status >= 400),
+        'throughput': requests / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--base-url', default='http://localhost:5003', help='Server to test')
+    parser.add_argument('--scenarios', nargs='+', default=['files-offset-deep', 'files-cursor-deep', 'search', 'search-text', 'stats', 'restore', 'restore-revalidate'])
+    parser.add_argument('--requests', type=int, default=500, help='Requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients')
+    parser.add_argument('--warmup', type=int, default=20, help='Untimed requests per scenario')
+    parser.add_argument('--per-page', type=int, default=50, help='Page size for the list scenarios')
+    parser.add_argument('--samples', type=int, default=20, help='Random pages to draw document ids from')
+    parser.add_argument('--restore-format', default='html', choices=['html', 'docx', 'pdf'])
+    parser.add_argument('--seed', type=int, default=42, help='Random seed, so runs send the same requests')
+    parser.add_argument('--json', dest='json_path', help='Also write the results to this file')
+    args = parser.parse_args()
+    
+    rng = random.Random(args.seed)
+    files, pages = sample_files(args.base_url, rng, args.samples, args.per_page)
+    if not files:
+        parser.error('No migrated files found; load a dataset with generate_data.py first')
+    
+    scenarios = build_scenarios(args, rng, files, pages)
+    unknown = set(args.scenarios) - set(scenarios)
+    if unknown:
+        parser.error(f'Unknown scenarios: {", ".join(sorted(unknown))}')
+    
+    print(f'{len(files):,} sampled files, {pages:,} pages, {args.requests} requests per scenario at concurrency {args.concurrency}')
+    print(f'{"scenario":<20} {"req/s":>9} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"errors":>7}')
+    
+    results = {}
+    for name in args.scenarios:
+        result = results[name] = run_scenario(args.base_url, scenarios[name], args.requests, args.concurrency, args.warmup)
+        print(f'{name:<20} {result["throughput"]:>9.1f} {result["p50_ms"]:>9.1f} {result["p95_ms"]:>9.1f} {result["p99_ms"]:>9.1f} {result["errors"]:>7}')
+    
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
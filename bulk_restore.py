@@ -0,0 +1,151 @@
+"""Parallel restore of many documents streamed back as a ZIP archive"""
+import json
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from html_cleaner import clean_quip_document
+from converters import sanitize_filename, convert_to_docx, convert_to_pdf
+import metrics
+
+CONVERTERS = {
+    'docx': convert_to_docx,
+    'pdf': convert_to_pdf
+}
+
+_lock = threading.Lock()
+_executor = None
+_executor_workers = None
+
+def get_executor(workers):
+    """Return the shared process pool, creating it on first use or after it was discarded"""
+    global _executor, _executor_workers
+    
+    with _lock:
+        if _executor is None or _executor_workers != workers:
+            if _executor is not None:
+                # Resized: jobs already running on the old pool still finish
+                _executor.shutdown(wait=False)
+            _executor = ProcessPoolExecutor(max_workers=workers)
+            _executor_workers = workers
+        return _executor
+
+def discard_executor(executor):
+    """Drop a broken pool, e.g. after a worker was OOM-killed, so the next get_executor replaces it"""
+    global _executor
+    
+    with _lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+def _submit(workers, *args):
+    """Submit a restore job to the shared pool, replacing the pool once if it turns out to be broken"""
+    executor = get_executor(workers)
+    try:
+        return executor.submit(restore_document_job, *args), executor
+    except BrokenProcessPool:
+        discard_executor(executor)
+        executor = get_executor(workers)
+        return executor.submit(restore_document_job, *args), executor
+
+def restore_document_job(html_content, output_format, timeout):
+    """Clean and convert one document in a worker process, returning (title, content bytes, conversion seconds)"""
+    cleaned_html, title = clean_quip_document(html_content)
+    
+    if output_format == 'html':
+        return title, cleaned_html.encode('utf-8'), None
+    
+    # Timed here because metrics recorded in a worker process would never be exported
+    started_at = time.perf_counter()
+    content = CONVERTERS[output_format](cleaned_html, timeout=timeout)
+    return title, content, time.perf_counter() - started_at
+
+class _StreamBuffer:
+    """Write-only file object that hands out what has been written so far"""
+    
+    def __init__(self):
+        self._chunks = []
+    
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+    
+    def flush(self):
+        pass
+    
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def stream_restore_zip(document_ids, load_document, output_format, workers, timeout):
+    """Convert documents in parallel and yield a ZIP archive as each conversion finishes
+    
+    load_document(document_id) returns (html_content, name) for each of
+    document_ids, raising if it cannot be restored. At most twice
+    the number of workers are loaded and in flight at any time. The
+    archive ends with manifest.json listing restored and failed documents.
+    """
+    buffer = _StreamBuffer()
+    archive = zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED)
+    manifest = {'format': output_format, 'requested': len(document_ids), 'restored': [], 'failed': []}
+    used_names = set()
+    pending = {}
+    remaining = iter(document_ids)
+    
+    def submit_next():
+        for document_id in remaining:
+            try:
+                html_content, name = load_document(document_id)
+            except Exception as e:
+                manifest['failed'].append({'document_id': document_id, 'error': str(e)})
+                continue
+            
+            if not html_content:
+                manifest['failed'].append({'document_id': document_id, 'error': 'No HTML content found for this document'})
+                continue
+            
+            future, executor = _submit(workers, html_content, output_format, timeout)
+            pending[future] = (document_id, name, executor)
+            return True
+        return False
+    
+    while len(pending) < workers * 2 and submit_next():
+        pass
+    
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        
+        for future in done:
+            document_id, name, executor = pending.pop(future)
+            try:
+                title, content, duration = future.result()
+            except BrokenProcessPool as e:
+                # A worker died and took the pool with it; later documents go to a fresh pool
+                discard_executor(executor)
+                manifest['failed'].append({'document_id': document_id, 'error': f'Worker process died: {e}'})
+            except Exception as e:
+                manifest['failed'].append({'document_id': document_id, 'error': str(e)})
+            else:
+                if duration is not None:
+                    metrics.CONVERSION_DURATION.observe((CONVERTERS[output_format].__name__, 'ok'), duration)
+                
+                base_name = sanitize_filename(title or name or f'quip_document_{document_id}') or document_id
+                filename = f'{base_name}.{output_format}'
+                if filename in used_names:
+                    filename = f'{base_name} ({document_id}).{output_format}'
+                used_names.add(filename)
+                
+                archive.writestr(filename, content)
+                manifest['restored'].append({'document_id': document_id, 'filename': filename})
+            
+            submit_next()
+        
+        # Send every finished document to the client right away
+        yield buffer.drain()
+    
+    archive.writestr('manifest.json', json.dumps(manifest, indent=2))
+    archive.close()
+    yield buffer.drain()
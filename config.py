@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -11,6 +12,51 @@ class Config:
         'pool_pre_ping': True,
         'pool_recycle': 300,
     }
+    # Rows fetched per round trip when streaming exports from a server-side cursor
+    EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 2000))
+    # Seconds /api/stats results are served from cache before being recomputed
+    STATS_CACHE_TTL = int(os.environ.get('STATS_CACHE_TTL', 30))
+    # Bounded LRU of resolved document ids, and how long an entry stays valid
+    RESOLVER_CACHE_SIZE = int(os.environ.get('RESOLVER_CACHE_SIZE', 10000))
+    RESOLVER_CACHE_TTL = int(os.environ.get('RESOLVER_CACHE_TTL', 300))
+    # Disk cache of converted DOCX/PDF files, evicted least recently used beyond the size limit
+    CONVERSION_CACHE_DIR = os.environ.get('CONVERSION_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'quip2gdrive-conversions'))
+    CONVERSION_CACHE_MAX_BYTES = int(os.environ.get('CONVERSION_CACHE_MAX_BYTES', 1024 * 1024 * 1024))
+    # Images extracted from inline base64 in restored documents, stored once per content hash
+    # and evicted least recently used beyond the size limit
+    IMAGE_STORE_DIR = os.environ.get('IMAGE_STORE_DIR', os.path.join(tempfile.gettempdir(), 'quip2gdrive-images'))
+    IMAGE_STORE_MAX_BYTES = int(os.environ.get('IMAGE_STORE_MAX_BYTES', 1024 * 1024 * 1024))
+    # Conversion worker pool: concurrent pandoc jobs, jobs allowed to wait, and per-job timeout in seconds
+    CONVERSION_WORKERS = int(os.environ.get('CONVERSION_WORKERS', os.cpu_count() or 4))
+    CONVERSION_QUEUE_SIZE = int(os.environ.get('CONVERSION_QUEUE_SIZE', 16))
+    CONVERSION_TIMEOUT = int(os.environ.get('CONVERSION_TIMEOUT', 60))
+    # Bulk restores: worker processes and the largest number of documents per request
+    BULK_RESTORE_WORKERS = int(os.environ.get('BULK_RESTORE_WORKERS', os.cpu_count() or 4))
+    BULK_RESTORE_MAX_DOCUMENTS = int(os.environ.get('BULK_RESTORE_MAX_DOCUMENTS', 1000))
+    # Dump imports: 'copy' uses the native parallel COPY loader, 'psql' pipes the dump through psql
+    IMPORT_LOADER = os.environ.get('IMPORT_LOADER', 'copy')
+    IMPORT_WORKERS = int(os.environ.get('IMPORT_WORKERS', 4))
+    IMPORT_CHUNK_BYTES = int(os.environ.get('IMPORT_CHUNK_BYTES', 256 * 1024 * 1024))
+    # Delta imports are refused when they would delete more than this fraction of a table's rows
+    DELTA_MAX_DELETE_FRACTION = float(os.environ.get('DELTA_MAX_DELETE_FRACTION', 0.1))
+    # Largest page size of the cursor-paginated listings
+    MAX_PER_PAGE = int(os.environ.get('MAX_PER_PAGE', 1000))
+    # Full-text search: matches ranked per query, the best of them paged through, and the largest page size
+    SEARCH_MAX_CANDIDATES = int(os.environ.get('SEARCH_MAX_CANDIDATES', 5000))
+    SEARCH_MAX_RESULTS = int(os.environ.get('SEARCH_MAX_RESULTS', 2000))
+    SEARCH_MAX_PER_PAGE = int(os.environ.get('SEARCH_MAX_PER_PAGE', 100))
+    # Id suggestions: shortest fragment looked up, most candidates returned, ids scanned for typos
+    # and how long a worker keeps its in-memory id index before reloading it
+    SUGGEST_MIN_LENGTH = int(os.environ.get('SUGGEST_MIN_LENGTH', 2))
+    SUGGEST_MAX_LIMIT = int(os.environ.get('SUGGEST_MAX_LIMIT', 25))
+    SUGGEST_SCAN_LIMIT = int(os.environ.get('SUGGEST_SCAN_LIMIT', 1000))
+    ID_INDEX_TTL = int(os.environ.get('ID_INDEX_TTL', 600))
+    # Seconds a worker keeps its quip_id -> google_drive_id link map before reloading it
+    LINK_MAP_TTL = int(os.environ.get('LINK_MAP_TTL', 600))
+    # Log SQL statements slower than this many milliseconds (0 disables the slow-query log)
+    SLOW_QUERY_THRESHOLD_MS = int(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 0))
+    # Cache-Control sent with the ETag/Last-Modified validators; 'no-cache' lets browsers and proxies store but revalidate
+    HTTP_CACHE_CONTROL = os.environ.get('HTTP_CACHE_CONTROL', 'no-cache')
 
 class DevelopmentConfig(Config):
     DEBUG = True
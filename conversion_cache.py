@@ -0,0 +1,110 @@
+"""Content-addressed disk cache for converted DOCX/PDF documents"""
+import hashlib
+import os
+import tempfile
+import threading
+from flask import current_app
+from conversion_service import conversion_service
+
+_lock = threading.Lock()
+_counters = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+def converter_version():
+    """Return the pandoc version found by the startup probe"""
+    return conversion_service.tools.get('pandoc_version') or 'unknown'
+
+def cache_key(cleaned_html, output_format):
+    """Hash the cleaned HTML together with the output format and converter version"""
+    digest = hashlib.sha256()
+    digest.update(converter_version().encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(output_format.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(cleaned_html.encode('utf-8'))
+    return digest.hexdigest()
+
+def _cache_path(key, output_format):
+    return os.path.join(current_app.config['CONVERSION_CACHE_DIR'], f'{key}.{output_format}')
+
+def lookup(cleaned_html, output_format):
+    """Return the cached output path for this document and format, or None on a miss"""
+    path = _cache_path(cache_key(cleaned_html, output_format), output_format)
+    
+    try:
+        # Touch the entry so eviction treats it as recently used
+        os.utime(path)
+    except FileNotFoundError:
+        with _lock:
+            _counters['misses'] += 1
+        return None
+    
+    with _lock:
+        _counters['hits'] += 1
+    return path
+
+def store(cleaned_html, output_format, content):
+    """Write freshly converted document bytes into the cache and return its cached path"""
+    cache_dir = current_app.config['CONVERSION_CACHE_DIR']
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _cache_path(cache_key(cleaned_html, output_format), output_format)
+    
+    # Write under a temporary name first so readers never see a partial file
+    fd, temp_path = tempfile.mkstemp(dir=cache_dir, suffix='.partial')
+    try:
+        with os.fdopen(fd, 'wb') as temp_file:
+            temp_file.write(content)
+        os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    
+    evict(current_app.config['CONVERSION_CACHE_MAX_BYTES'], keep=path)
+    return path
+
+def _entries(cache_dir):
+    """List (mtime, size, path) for every complete cache entry"""
+    entries = []
+    with os.scandir(cache_dir) as scan:
+        for entry in scan:
+            if entry.is_file() and not entry.name.endswith('.partial'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+    return entries
+
+def evict(max_bytes, keep=None):
+    """Delete least recently used entries until the cache fits in max_bytes"""
+    cache_dir = current_app.config['CONVERSION_CACHE_DIR']
+    
+    with _lock:
+        entries = sorted(_entries(cache_dir))
+        total_bytes = sum(size for _, size, _ in entries)
+        
+        for _, size, path in entries:
+            if total_bytes <= max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_bytes -= size
+            _counters['evictions'] += 1
+
+def cache_stats():
+    """Return hit/miss counters together with the current cache size"""
+    cache_dir = current_app.config['CONVERSION_CACHE_DIR']
+    entries = _entries(cache_dir) if os.path.isdir(cache_dir) else []
+    
+    with _lock:
+        counters = dict(_counters)
+    
+    lookups = counters['hits'] + counters['misses']
+    return {
+        **counters,
+        'hit_rate': counters['hits'] / lookups if lookups else None,
+        'entries': len(entries),
+        'bytes': sum(size for _, size, _ in entries),
+        'max_bytes': current_app.config['CONVERSION_CACHE_MAX_BYTES']
+    }
@@ -0,0 +1,114 @@
+"""Bounded worker pool that runs document conversions with backpressure"""
+import functools
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import metrics
+
+class ConversionQueueFull(Exception):
+    """Raised when every worker is busy and the wait queue is full"""
+
+class ConversionService:
+    """Run conversions on a fixed set of workers with a bounded wait queue"""
+    
+    def __init__(self):
+        self.executor = None
+        self.workers = 0
+        self.queue_size = 0
+        self.timeout = 60
+        self.tools = {}
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._active = 0
+    
+    def init_app(self, app):
+        """Size the pool from the app config and probe the conversion tools once"""
+        self.workers = app.config['CONVERSION_WORKERS']
+        self.queue_size = app.config['CONVERSION_QUEUE_SIZE']
+        self.timeout = app.config['CONVERSION_TIMEOUT']
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='conversion')
+        self.tools = probe_tools()
+        
+        app.extensions['conversion_service'] = self
+    
+    def submit(self, func, *args):
+        """Queue a conversion, raising ConversionQueueFull instead of waiting for a slot"""
+        # Running plus waiting jobs are capped so peak traffic queues predictably
+        with self._lock:
+            if self._pending >= self.workers + self.queue_size:
+                raise ConversionQueueFull(
+                    f'All {self.workers} conversion workers are busy and {self.queue_size} jobs are already waiting'
+                )
+            self._pending += 1
+        
+        try:
+            future = self.executor.submit(self._run, time.perf_counter(), func, *args)
+        except Exception:
+            self._release()
+            raise
+        
+        future.add_done_callback(lambda _: self._release())
+        return future
+    
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+    
+    def run(self, func, *args):
+        """Queue a conversion and wait for its result"""
+        return self.submit(func, *args).result()
+    
+    def _run(self, submitted_at, func, *args):
+        started_at = time.perf_counter()
+        metrics.CONVERSION_QUEUE_WAIT.observe((), started_at - submitted_at)
+        outcome = 'error'
+        
+        with self._lock:
+            self._active += 1
+        try:
+            result = func(*args, timeout=self.timeout)
+            outcome = 'ok'
+            return result
+        finally:
+            with self._lock:
+                self._active -= 1
+            metrics.CONVERSION_DURATION.observe((func.__name__, outcome), time.perf_counter() - started_at)
+    
+    def status(self):
+        """Return pool size, current load and the tool probe results"""
+        with self._lock:
+            active = self._active
+            pending = self._pending
+        
+        return {
+            'workers': self.workers,
+            'queue_size': self.queue_size,
+            'active': active,
+            'queued': max(pending - active, 0),
+            'timeout': self.timeout,
+            'tools': self.tools
+        }
+
+@functools.lru_cache(maxsize=None)
+def probe_tools():
+    """Check once which conversion tools are installed and which pandoc version is in use"""
+    pandoc_path = shutil.which('pandoc')
+    pandoc_version = None
+    
+    if pandoc_path:
+        try:
+            result = subprocess.run([pandoc_path, '--version'], capture_output=True, text=True, timeout=10)
+            if result.returncode == 0 and result.stdout:
+                pandoc_version = result.stdout.splitlines()[0]
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+    
+    return {
+        'pandoc': pandoc_path,
+        'pandoc_version': pandoc_version,
+        'pdflatex': shutil.which('pdflatex')
+    }
+
+conversion_service = ConversionService()
@@ -0,0 +1,87 @@
+"""Pandoc based conversion of cleaned HTML to downloadable formats"""
+import os
+import re
+import subprocess
+import tempfile
+from conversion_service import probe_tools
+
+def sanitize_filename(filename):
+    """Sanitize filename for safe file system usage"""
+    # Remove or replace invalid characters
+    filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
+    # Remove extra spaces and dots
+    filename = re.sub(r'\s+', ' ', filename).strip()
+    filename = filename.strip('.')
+    # Limit length
+    if len(filename) > 100:
+        filename = filename[:100]
+    return filename
+
+def convert_to_docx(cleaned_html, timeout=60):
+    """Convert HTML to DOCX using pandoc, returning the document bytes"""
+    try:
+        # Pandoc availability is probed once per process
+        if not probe_tools()['pandoc']:
+            raise Exception("Pandoc is not installed. Please install pandoc to convert documents.")
+        
+        # HTML is piped in on stdin and the DOCX read back from stdout, so nothing touches the disk
+        result = subprocess.run([
+            'pandoc',
+            '-f', 'html',
+            '-t', 'docx'
+        ], input=cleaned_html.encode('utf-8'), capture_output=True, timeout=timeout)
+        
+        if result.returncode == 0 and result.stdout:
+            return result.stdout
+        else:
+            error_msg = result.stderr.decode('utf-8', 'replace') if result.stderr else "Unknown pandoc error"
+            raise Exception(f"Pandoc conversion failed: {error_msg}")
+            
+    except subprocess.TimeoutExpired:
+        raise Exception(f"Document conversion timed out after {timeout} seconds")
+    except FileNotFoundError:
+        raise Exception("Pandoc is not installed. Please install pandoc to convert documents.")
+    except Exception as e:
+        raise Exception(f"Conversion error: {str(e)}")
+
+def convert_to_pdf(cleaned_html, timeout=60):
+    """Convert HTML to PDF using pandoc, returning the document bytes"""
+    try:
+        # Pandoc availability is probed once per process
+        if not probe_tools()['pandoc']:
+            raise Exception("Pandoc is not installed. Please install pandoc to convert documents.")
+        
+        # LaTeX needs a real output file, so each job gets a private directory that is removed afterwards
+        with tempfile.TemporaryDirectory(prefix='quip2gdrive-pdf-') as job_dir:
+            output_path = os.path.join(job_dir, 'document.pdf')
+            
+            # Try pandoc with LaTeX for PDF conversion
+            result = subprocess.run([
+                'pandoc',
+                '-f', 'html',
+                '-t', 'pdf',
+                '--pdf-engine=pdflatex',
+                '-o', output_path
+            ], input=cleaned_html.encode('utf-8'), capture_output=True, timeout=timeout, cwd=job_dir)
+            
+            if result.returncode == 0 and os.path.exists(output_path):
+                with open(output_path, 'rb') as output_file:
+                    return output_file.read()
+        
+        error_msg = result.stderr.decode('utf-8', 'replace') if result.stderr else "Unknown conversion error"
+        if "pdflatex not found" in error_msg:
+            raise Exception(
+                "PDF conversion requires LaTeX. To enable PDF conversion, please install LaTeX:\n"
+                "1. Install MacTeX: brew install --cask mactex\n"
+                "2. Or use DOCX format instead, which doesn't require LaTeX\n"
+                "Error: " + error_msg
+            )
+        else:
+            raise Exception(f"PDF conversion failed: {error_msg}")
+            
+    except subprocess.TimeoutExpired:
+        raise Exception(f"Document conversion timed out after {timeout} seconds")
+    except FileNotFoundError:
+        raise Exception("Required conversion tools are not installed. Please install pandoc and LaTeX for PDF conversion.")
+    except Exception as e:
+        raise Exception(f"Conversion error: {str(e)}")
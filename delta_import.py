@@ -0,0 +1,159 @@
+"""Incremental dump imports that merge only rows changed since the last import"""
+from datetime import datetime
+from models import db, QuipMigrationFile, QuipMigrationFolder, MigrationLog
+from dump_loader import DumpLoader
+
+STAGING_SCHEMA = 'quip_delta'
+WATERMARK_ACTION = 'delta_watermark'
+
+# Tables merged by a delta import; everything else in the dump is ignored
+DELTA_MODELS = [QuipMigrationFile, QuipMigrationFolder]
+
+class DeltaDeleteRefused(Exception):
+    """Raised before merging when a delta would delete more rows than allowed"""
+
+def last_watermark():
+    """Return the newest when_updated seen by the previous delta import, or None"""
+    log = MigrationLog.query.filter_by(
+        action=WATERMARK_ACTION, status='completed'
+    ).order_by(MigrationLog.id.desc()).first()
+    return datetime.fromisoformat(log.message) if log and log.message else None
+
+def _prepare_staging():
+    """Recreate empty, unlogged, index-free copies of the delta tables"""
+    with db.engine.begin() as connection:
+        connection.execute(db.text(f'DROP SCHEMA IF EXISTS {STAGING_SCHEMA} CASCADE'))
+        connection.execute(db.text(f'CREATE SCHEMA {STAGING_SCHEMA}'))
+        for model in DELTA_MODELS:
+            connection.execute(db.text(
+                f'CREATE UNLOGGED TABLE {STAGING_SCHEMA}.{model.__tablename__} '
+                f'(LIKE public.{model.__tablename__} INCLUDING DEFAULTS)'
+            ))
+
+def _planned_deletes(connection, model):
+    """Return (staged rows, live rows, live rows missing from the staged dump) for one table"""
+    table = model.__tablename__
+    key = model.__table__.primary_key.columns.values()[0].name
+    
+    return connection.execute(db.text(f'''
+        SELECT
+            (SELECT count(*) FROM {STAGING_SCHEMA}.{table}),
+            (SELECT count(*) FROM public.{table}),
+            (SELECT count(*) FROM public.{table} AS t
+             WHERE NOT EXISTS (SELECT 1 FROM {STAGING_SCHEMA}.{table} AS s WHERE s.{key} = t.{key}))
+    ''')).one()
+
+def check_planned_deletes(connection, max_delete_fraction):
+    """Refuse a delta whose dump looks incomplete, before anything is merged
+    
+    A dump missing a table's COPY block, or with an empty or truncated one,
+    would otherwise delete every row of that table the dump lacks. Returns a
+    summary line per table of what the merge will delete.
+    """
+    planned = []
+    refused = []
+    
+    for model in DELTA_MODELS:
+        table = model.__tablename__
+        staged, live, missing = _planned_deletes(connection, model)
+        planned.append(f'{table}: {missing:,} of {live:,} rows would be deleted ({staged:,} staged)')
+        
+        if live and missing / live > max_delete_fraction:
+            if not staged:
+                refused.append(f'{table} has no rows in the dump, which would delete all {live:,}')
+            else:
+                refused.append(f'{table} would lose {missing:,} of {live:,} rows, more than {max_delete_fraction:.0%}')
+    
+    if refused:
+        raise DeltaDeleteRefused(
+            'Delta import refused, nothing was merged: ' + '; '.join(refused) +
+            '. Check the dump, or raise DELTA_MAX_DELETE_FRACTION if the deletes are intended.'
+        )
+    return planned
+
+def _merge(connection, model, watermark):
+    """Upsert changed rows and delete vanished ones, returning (inserted, updated, deleted)"""
+    table = model.__tablename__
+    key = model.__table__.primary_key.columns.values()[0].name
+    columns = [column.name for column in model.__table__.columns]
+    column_list = ', '.join(columns)
+    updates = ', '.join(f'{column} = EXCLUDED.{column}' for column in columns if column != key)
+    
+    # Rows older than the watermark can only matter if they are new to us
+    candidates = f'SELECT {column_list} FROM {STAGING_SCHEMA}.{table} AS s'
+    if watermark:
+        candidates += (
+            f' WHERE s.when_updated > :watermark'
+            f' OR NOT EXISTS (SELECT 1 FROM public.{table} AS t WHERE t.{key} = s.{key})'
+        )
+    
+    inserted, updated = connection.execute(db.text(f'''
+        WITH upserted AS (
+            INSERT INTO public.{table} AS t ({column_list})
+            {candidates}
+            ON CONFLICT ({key}) DO UPDATE SET {updates}
+            WHERE EXCLUDED.when_updated > t.when_updated
+               OR (t.when_updated IS NULL AND EXCLUDED.when_updated IS NOT NULL)
+            RETURNING (xmax = 0) AS inserted
+        )
+        SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted) FROM upserted
+    '''), {'watermark': watermark}).one()
+    
+    deleted = connection.execute(db.text(f'''
+        DELETE FROM public.{table} AS t
+        WHERE NOT EXISTS (SELECT 1 FROM {STAGING_SCHEMA}.{table} AS s WHERE s.{key} = t.{key})
+    ''')).rowcount
+    
+    return inserted, updated, deleted
+
+def run_delta_import(job, app, on_progress):
+    """Stage the dump's file and folder rows, merge the changes and record a new watermark"""
+    watermark = last_watermark()
+    _prepare_staging()
+    
+    summary = []
+    try:
+        loader = DumpLoader(
+            job.dump_file_path,
+            app.config['SQLALCHEMY_DATABASE_URI'],
+            job,
+            workers=app.config['IMPORT_WORKERS'],
+            chunk_bytes=app.config['IMPORT_CHUNK_BYTES'],
+            copy_targets={model.__tablename__: f'{STAGING_SCHEMA}.{model.__tablename__}' for model in DELTA_MODELS}
+        )
+        loader.load(on_progress)
+        job.check_cancelled()
+        
+        # Merge every table in one transaction so readers never see a half-applied delta
+        with db.engine.begin() as connection:
+            for model in DELTA_MODELS:
+                connection.execute(db.text(f'ANALYZE {STAGING_SCHEMA}.{model.__tablename__}'))
+            
+            planned = check_planned_deletes(connection, app.config['DELTA_MAX_DELETE_FRACTION'])
+            app.logger.info('Delta import %s merging: %s', job.id, '; '.join(planned))
+            
+            new_watermark = watermark
+            for model in DELTA_MODELS:
+                inserted, updated, deleted = _merge(connection, model, watermark)
+                summary.append(f'{model.__tablename__}: {inserted:,} inserted, {updated:,} updated, {deleted:,} deleted')
+                
+                table_max = connection.execute(db.text(
+                    f'SELECT max(when_updated) FROM {STAGING_SCHEMA}.{model.__tablename__}'
+                )).scalar()
+                if table_max and (new_watermark is None or table_max > new_watermark):
+                    new_watermark = table_max
+    finally:
+        with db.engine.begin() as connection:
+            connection.execute(db.text(f'DROP SCHEMA IF EXISTS {STAGING_SCHEMA} CASCADE'))
+    
+    if new_watermark:
+        db.session.add(MigrationLog(
+            document_id='SYSTEM',
+            action=WATERMARK_ACTION,
+            status='completed',
+            message=new_watermark.isoformat()
+        ))
+        db.session.commit()
+    
+    summary.append(f"Watermark: {watermark.isoformat() if watermark else 'none'} -> {new_watermark.isoformat() if new_watermark else 'none'}")
+    return '\n'.join(summary)
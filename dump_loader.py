@@ -0,0 +1,290 @@
+"""Native loader for plain-format SQL dumps that runs COPY blocks in parallel
+
+The dump is streamed once. Schema statements are executed in order as
+they are read, every COPY block is split into line-aligned chunks that
+are loaded concurrently over separate connections with copy_expert, and
+index/constraint statements are held back until all data is loaded.
+"""
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_EXCEPTION, wait
+import psycopg2
+
+# Statements that build indexes or constraints run only after all data is loaded
+DEFERRED_STATEMENT = re.compile(
+    r'^\s*(CREATE\s+(UNIQUE\s+)?INDEX|ALTER\s+TABLE\s+(ONLY\s+)?\S+\s+ADD\s+CONSTRAINT|CREATE\s+(CONSTRAINT\s+)?TRIGGER)',
+    re.IGNORECASE
+)
+# Session settings (client_encoding, standard_conforming_strings, session_replication_role,
+# search_path, ...) that every COPY connection must share with the schema connection
+SESSION_SETTING = re.compile(r'^\s*(SET\s+(?!LOCAL\b)|SELECT\s+pg_catalog\.set_config\s*\()', re.IGNORECASE)
+COPY_FROM_STDIN = re.compile(rb'^COPY\s+(\S+)\s.*FROM\s+stdin;\s*$', re.IGNORECASE)
+COPY_END = b'\\.'
+READ_SIZE = 1024 * 1024
+
+class StatementSplitter:
+    """Split SQL text into statements, respecting quotes, dollar quotes and comments"""
+    
+    def __init__(self):
+        self._buffer = []
+        self._quote = None  # "'", '"' or a $tag$ while inside a quoted section
+        self._block_comment = False
+    
+    @property
+    def empty(self):
+        return not ''.join(self._buffer).strip()
+    
+    def feed(self, text):
+        """Add text and return every statement it completes"""
+        statements = []
+        start = 0
+        i = 0
+        
+        while i < len(text):
+            if self._block_comment:
+                end = text.find('*/', i)
+                if end == -1:
+                    break
+                self._block_comment = False
+                i = end + 2
+                continue
+            
+            if self._quote:
+                end = text.find(self._quote, i)
+                if end == -1:
+                    break
+                i = end + len(self._quote)
+                self._quote = None
+                continue
+            
+            char = text[i]
+            if char == '-' and text.startswith('--', i):
+                # Line comments are dropped so a comment-only buffer still counts as empty
+                self._buffer.append(text[start:i])
+                newline = text.find('\n', i)
+                i = start = len(text) if newline == -1 else newline
+            elif char == '/' and text.startswith('/*', i):
+                self._block_comment = True
+                i += 2
+            elif char in ("'", '"'):
+                self._quote = char
+                i += 1
+            elif char == '$':
+                match = re.match(r'\$[A-Za-z_0-9]*\$', text[i:])
+                if match:
+                    self._quote = match.group(0)
+                    i += len(self._quote)
+                else:
+                    i += 1
+            elif char == ';':
+                self._buffer.append(text[start:i + 1])
+                statement = ''.join(self._buffer).strip()
+                self._buffer = []
+                if statement != ';':
+                    statements.append(statement)
+                start = i + 1
+                i += 1
+            else:
+                i += 1
+        
+        self._buffer.append(text[start:])
+        return statements
+
+class _RangeReader:
+    """File-like reader over [start, end) of the dump, used as the copy_expert source"""
+    
+    def __init__(self, path, start, end, on_read):
+        self._file = open(path, 'rb')
+        self._file.seek(start)
+        self._remaining = end - start
+        self._on_read = on_read
+    
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self._remaining:
+            size = min(self._remaining, READ_SIZE)
+        
+        data = self._file.read(size)
+        self._remaining -= len(data)
+        self._on_read(data)
+        return data
+    
+    readline = read
+    
+    def close(self):
+        self._file.close()
+
+class DumpLoader:
+    """Load one dump file into a database; see the module docstring"""
+    
+    def __init__(self, dump_file_path, db_url, job, workers=4, chunk_bytes=256 * 1024 * 1024, copy_targets=None):
+        """copy_targets optionally maps table names to the tables their rows are
+        copied into; when given, only those tables are loaded and every other
+        statement in the dump is skipped."""
+        self.dump_file_path = dump_file_path
+        self.db_url = db_url
+        self.job = job
+        self.workers = workers
+        self.chunk_bytes = chunk_bytes
+        self.copy_targets = copy_targets
+        self.statements_executed = 0
+        self.errors = []
+        self.copy_errors = []
+        self.session_settings = []
+        self._lock = threading.Lock()
+        self._connection = None
+    
+    def _add_bytes(self, count):
+        with self._lock:
+            self.job.bytes_processed += count
+    
+    def _add_rows(self, table, count):
+        with self._lock:
+            self.job.rows_per_table[table] = self.job.rows_per_table.get(table, 0) + count
+    
+    def _execute(self, statement):
+        """Execute one statement, recording errors and carrying on like psql does"""
+        try:
+            with self._connection.cursor() as cursor:
+                cursor.execute(statement)
+            self.statements_executed += 1
+        except psycopg2.Error as e:
+            self.errors.append(f'{e.pgerror or e}'.strip())
+            return
+        
+        # Replayed on every COPY connection; settings the server rejected are left out
+        if SESSION_SETTING.match(statement):
+            self.session_settings.append(statement)
+    
+    def _copy_chunk(self, copy_sql, table, start, end, session_settings):
+        """Load one line-aligned chunk of a COPY block over its own connection"""
+        def on_read(data):
+            self.job.check_cancelled()
+            self._add_bytes(len(data))
+            self._add_rows(table, data.count(b'\n'))
+        
+        connection = psycopg2.connect(self.db_url)
+        reader = _RangeReader(self.dump_file_path, start, end, on_read)
+        try:
+            with connection:
+                with connection.cursor() as cursor:
+                    for setting in session_settings:
+                        cursor.execute(setting)
+                    cursor.copy_expert(copy_sql, reader, size=READ_SIZE)
+        except psycopg2.Error as e:
+            self.copy_errors.append(f'COPY {table} failed: {(e.pgerror or str(e)).strip()}')
+        finally:
+            reader.close()
+            connection.close()
+    
+    def load(self, on_progress):
+        """Run the load and return a psql-like summary; raises if any COPY failed
+        
+        on_progress() is called regularly from the calling thread so it can
+        report progress while the chunks load.
+        """
+        self._connection = psycopg2.connect(self.db_url)
+        self._connection.autocommit = True
+        splitter = StatementSplitter()
+        deferred = []
+        futures = []
+        
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='copy')
+        try:
+            def submit_chunk(copy_sql, table, start, end):
+                if copy_sql is None:
+                    # A block of a table that is not being loaded
+                    self._add_bytes(end - start)
+                elif end > start:
+                    futures.append(executor.submit(
+                        self._copy_chunk, copy_sql, table, start, end, tuple(self.session_settings)
+                    ))
+                on_progress()
+            
+            with open(self.dump_file_path, 'rb') as dump_file:
+                offset = 0
+                copy = None  # (copy_sql, table, chunk_start) inside a COPY block
+                
+                for line in dump_file:
+                    line_start = offset
+                    offset += len(line)
+                    
+                    if copy:
+                        copy_sql, table, chunk_start = copy
+                        if line.rstrip(b'\r\n') == COPY_END:
+                            submit_chunk(copy_sql, table, chunk_start, line_start)
+                            self._add_bytes(len(line))
+                            copy = None
+                        elif offset - chunk_start >= self.chunk_bytes:
+                            # Rows are single lines, so any line end is a valid split point
+                            submit_chunk(copy_sql, table, chunk_start, offset)
+                            copy = (copy_sql, table, offset)
+                        continue
+                    
+                    self.job.check_cancelled()
+                    self._add_bytes(len(line))
+                    on_progress()
+                    
+                    match = COPY_FROM_STDIN.match(line) if splitter.empty else None
+                    if match:
+                        table = match.group(1).decode('utf-8', 'replace').split('.')[-1].strip('"')
+                        copy_sql = line.decode('utf-8').strip().rstrip(';')
+                        
+                        if self.copy_targets is None:
+                            self._add_rows(table, 0)
+                        elif table in self.copy_targets:
+                            self._add_rows(table, 0)
+                            copy_sql = copy_sql.replace(match.group(1).decode('utf-8'), self.copy_targets[table], 1)
+                        else:
+                            copy_sql = None
+                        
+                        copy = (copy_sql, table, offset)
+                        continue
+                    
+                    # psql meta-commands such as \connect only make sense to psql
+                    if splitter.empty and line.startswith(b'\\'):
+                        continue
+                    
+                    for statement in splitter.feed(line.decode('utf-8')):
+                        if self.copy_targets is not None:
+                            # Only the targeted COPY blocks, and the settings they load under, run in data-only mode
+                            if SESSION_SETTING.match(statement):
+                                self._execute(statement)
+                        elif DEFERRED_STATEMENT.match(statement):
+                            deferred.append(statement)
+                        else:
+                            self._execute(statement)
+            
+            # Wait for the remaining chunks, reporting progress as they load
+            pending = futures
+            while pending:
+                done, pending = wait(pending, timeout=1, return_when=FIRST_EXCEPTION)
+                for future in done:
+                    future.result()
+                on_progress()
+            
+            executor.shutdown()
+            self.job.check_cancelled()
+            if self.copy_errors:
+                raise Exception('; '.join(self.copy_errors[:5]))
+            
+            # Build indexes and constraints once, over the fully loaded tables
+            for statement in deferred:
+                self.job.check_cancelled()
+                self._execute(statement)
+        except BaseException:
+            # Chunks that have not started yet are dropped; running ones stop at their next read
+            executor.shutdown(cancel_futures=True)
+            raise
+        finally:
+            self._connection.close()
+        
+        rows = sum(self.job.rows_per_table.values())
+        summary = (
+            f'Executed {self.statements_executed} statements ({len(deferred)} deferred until after the data), '
+            f'loaded {rows:,} rows into {len(self.job.rows_per_table)} tables in {len(futures)} parallel COPY chunks'
+        )
+        if self.errors:
+            summary += f'\n{len(self.errors)} statement(s) failed:\n' + '\n'.join(self.errors[:20])
+        return summary
@@ -0,0 +1,133 @@
+"""Folder hierarchy materialized as a closure table so subtree queries are single index scans"""
+from models import db, QuipMigrationFile, QuipMigrationFolder, FolderTreeEntry, FILE_SUMMARY_COLUMNS, FOLDER_SUMMARY_COLUMNS
+
+# Deeper chains are treated as corrupt data rather than followed forever
+MAX_DEPTH = 100
+
+BUILD_SQL = f'''
+    INSERT INTO quip_folder_tree (ancestor_id, descendant_kind, descendant_id, descendant_quip_id, depth)
+    WITH RECURSIVE edges AS (
+        SELECT parent.quip_migration_folder_id AS parent_id, child.quip_migration_folder_id AS child_id
+        FROM quip_migration_folders AS child
+        JOIN quip_migration_folders AS parent ON parent.quip_id = child.parent_folder
+    ),
+    closure (ancestor_id, descendant_id, depth, path) AS (
+        SELECT quip_migration_folder_id, quip_migration_folder_id, 0, ARRAY[quip_migration_folder_id]
+        FROM quip_migration_folders
+        UNION ALL
+        SELECT closure.ancestor_id, edges.child_id, closure.depth + 1, closure.path || edges.child_id
+        FROM closure
+        JOIN edges ON edges.parent_id = closure.descendant_id
+        -- The path check stops cycles in parent_folder from recursing
+        WHERE edges.child_id <> ALL (closure.path) AND closure.depth < {MAX_DEPTH}
+    ),
+    folder_closure AS (
+        SELECT ancestor_id, descendant_id, min(depth) AS depth
+        FROM closure
+        GROUP BY ancestor_id, descendant_id
+    ),
+    file_parents AS (
+        SELECT DISTINCT file.quip_migration_file_id, file.quip_id, folder.quip_migration_folder_id AS folder_id
+        FROM quip_migration_files AS file
+        CROSS JOIN unnest(file.parent_folders) AS parent (quip_id)
+        JOIN quip_migration_folders AS folder ON folder.quip_id = parent.quip_id
+    )
+    SELECT folder_closure.ancestor_id, 'folder', folder_closure.descendant_id, folder.quip_id, folder_closure.depth
+    FROM folder_closure
+    JOIN quip_migration_folders AS folder ON folder.quip_migration_folder_id = folder_closure.descendant_id
+    UNION ALL
+    SELECT folder_closure.ancestor_id, 'file', file_parents.quip_migration_file_id, file_parents.quip_id, min(folder_closure.depth) + 1
+    FROM file_parents
+    JOIN folder_closure ON folder_closure.descendant_id = file_parents.folder_id
+    GROUP BY folder_closure.ancestor_id, file_parents.quip_migration_file_id, file_parents.quip_id
+'''
+
+def is_supported():
+    """The tree is built with PostgreSQL array functions"""
+    return db.engine.dialect.name == 'postgresql'
+
+def rebuild_folder_tree():
+    """Recompute the closure table from the imported folders and files, returning row counts"""
+    if not is_supported():
+        return None
+    
+    inspector = db.inspect(db.engine)
+    if not inspector.has_table(QuipMigrationFolder.__tablename__) or not inspector.has_table(QuipMigrationFile.__tablename__):
+        return None
+    
+    FolderTreeEntry.__table__.create(db.engine, checkfirst=True)
+    tree_indexes = sorted(FolderTreeEntry.__table__.indexes, key=lambda index: index.name)
+    
+    with db.engine.begin() as connection:
+        # Refill without the secondary indexes and build them once at the end
+        connection.execute(db.text(f'TRUNCATE {FolderTreeEntry.__tablename__}'))
+        for index in tree_indexes:
+            connection.execute(db.text(f'DROP INDEX IF EXISTS {index.name}'))
+        
+        connection.execute(db.text(BUILD_SQL))
+        
+        for index in tree_indexes:
+            index.create(connection)
+        connection.execute(db.text(f'ANALYZE {FolderTreeEntry.__tablename__}'))
+        
+        counts = dict(connection.execute(
+            db.select(FolderTreeEntry.descendant_kind, db.func.count())
+            .group_by(FolderTreeEntry.descendant_kind)
+        ).all())
+    
+    return {'folder_entries': counts.get('folder', 0), 'file_entries': counts.get('file', 0)}
+
+def children_statement(folder_id, limit, offset=0):
+    """Direct subfolders (first) and files of a folder, each ordered by quip id"""
+    tree = FolderTreeEntry
+    return db.select(
+        tree.descendant_kind.label('kind'),
+        tree.descendant_id.label('id'),
+        tree.descendant_quip_id.label('quip_id'),
+        db.func.coalesce(QuipMigrationFolder.google_drive_id, QuipMigrationFile.google_drive_id).label('google_drive_id'),
+        db.func.coalesce(QuipMigrationFolder.obfuscated_name, QuipMigrationFile.obfuscated_name).label('name'),
+        QuipMigrationFile.document_type
+    ).outerjoin(
+        QuipMigrationFolder,
+        db.and_(tree.descendant_kind == 'folder', QuipMigrationFolder.quip_migration_folder_id == tree.descendant_id)
+    ).outerjoin(
+        QuipMigrationFile,
+        db.and_(tree.descendant_kind == 'file', QuipMigrationFile.quip_migration_file_id == tree.descendant_id)
+    ).where(
+        tree.ancestor_id == folder_id,
+        tree.depth == 1
+    ).order_by(
+        tree.descendant_kind.desc(), tree.descendant_quip_id
+    ).limit(limit).offset(offset)
+
+def ancestors_statement(kind, document_id):
+    """Every folder above a file or folder, from the root down to its parent"""
+    tree = FolderTreeEntry
+    return db.select(
+        tree.depth,
+        *FOLDER_SUMMARY_COLUMNS
+    ).join(
+        QuipMigrationFolder, QuipMigrationFolder.quip_migration_folder_id == tree.ancestor_id
+    ).where(
+        tree.descendant_kind == kind,
+        tree.descendant_id == document_id,
+        tree.depth > 0
+    ).order_by(tree.depth.desc())
+
+def files_under_statement(folder_id, limit, after=None):
+    """Files anywhere under a folder in (quip_id, id) order, seeking past after=(quip_id, id)"""
+    tree = FolderTreeEntry
+    statement = db.select(
+        tree.depth,
+        *FILE_SUMMARY_COLUMNS
+    ).join(
+        QuipMigrationFile, QuipMigrationFile.quip_migration_file_id == tree.descendant_id
+    ).where(
+        tree.ancestor_id == folder_id,
+        tree.descendant_kind == 'file'
+    )
+    
+    if after:
+        statement = statement.where(db.tuple_(tree.descendant_quip_id, tree.descendant_id) > db.tuple_(*after))
+    
+    return statement.order_by(tree.descendant_quip_id, tree.descendant_id).limit(limit)
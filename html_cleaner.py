@@ -0,0 +1,81 @@
+"""Single-pass, lxml-backed cleaning of Quip HTML"""
+import re
+import lxml.html
+
+QUIP_CLASS_PREFIX = 'quip-'
+QUIP_ATTRIBUTE_PREFIX = 'data-quip-'
+REMOVED_TAGS = {'script', 'style'}
+HEADING_TAGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+
+# Bump whenever a change here (or in what restores do around cleaning) changes the restored output,
+# so cached restores are revalidated instead of reused
+CLEANER_VERSION = '4'
+
+_whitespace = re.compile(r'\s+')
+
+# lxml refuses str input that declares its own encoding, and the text is already decoded
+_xml_declaration = re.compile(r'^\s*<\?xml[^>]*\?>')
+
+def _normalize_text(text):
+    """Collapse whitespace runs, dropping text that is only whitespace between tags"""
+    if not text or text.isspace():
+        return None
+    return _whitespace.sub(' ', text)
+
+def clean_quip_document(html_content):
+    """Clean Quip HTML and extract its title with a single parse
+
+    Returns (cleaned_html, title). The title is the first h1, then the
+    <title>, then the first heading of any level, or None.
+    """
+    try:
+        root = lxml.html.document_fromstring(_xml_declaration.sub('', html_content, count=1))
+        first_elements = {}
+        
+        for element in list(root.iter()):
+            # Comments and processing instructions only need their tail normalized
+            if not isinstance(element.tag, str):
+                element.tail = _normalize_text(element.tail)
+                continue
+            
+            # Remove script and style tags (drop_tree keeps the text after them)
+            if element.tag in REMOVED_TAGS:
+                previous, parent = element.getprevious(), element.getparent()
+                element.drop_tree()
+                # The kept text is merged into text this loop has already normalized
+                if previous is not None:
+                    previous.tail = _normalize_text(previous.tail)
+                elif parent is not None:
+                    parent.text = _normalize_text(parent.text)
+                continue
+            
+            if element.tag not in first_elements:
+                first_elements[element.tag] = element
+            
+            # Remove Quip-specific classes
+            classes = element.get('class')
+            if classes is not None:
+                kept = [cls for cls in classes.split() if not cls.startswith(QUIP_CLASS_PREFIX)]
+                if kept:
+                    element.set('class', ' '.join(kept))
+                else:
+                    del element.attrib['class']
+            
+            # Remove Quip-specific attributes
+            for attr in [attr for attr in element.attrib if attr.startswith(QUIP_ATTRIBUTE_PREFIX)]:
+                del element.attrib[attr]
+            
+            element.text = _normalize_text(element.text)
+            element.tail = _normalize_text(element.tail)
+        
+        title = None
+        for tag in ('h1', 'title') + HEADING_TAGS[1:]:
+            if tag in first_elements:
+                title = first_elements[tag].text_content().strip()
+                break
+        
+        return lxml.html.tostring(root, encoding='unicode'), title
+        
+    except Exception:
+        # If lxml fails, return original content
+        return html_content, None
@@ -0,0 +1,52 @@
+"""ETag and Last-Modified validators for document responses, checked before any content is loaded"""
+import hashlib
+from collections import namedtuple
+from flask import current_app, request
+from werkzeug.http import is_resource_modified
+from models import db, QuipMigrationFile, QuipMigrationFolder
+
+Validators = namedtuple('Validators', ['etag', 'last_modified'])
+
+def document_validators(resolved, variant, last_modified=True):
+    """Return the Validators of one response variant of a resolved document, or None without a when_updated
+    
+    The ETag hashes the variant (e.g. 'restore:docx'), the resolved ids and
+    name, and when_updated, which imports bump whenever a row's content changes.
+    Pass last_modified=False when the variant holds more than the row's own
+    changes, so revalidation relies on the ETag alone.
+    """
+    if resolved.kind == 'file':
+        column, id_column = QuipMigrationFile.when_updated, QuipMigrationFile.quip_migration_file_id
+    else:
+        column, id_column = QuipMigrationFolder.when_updated, QuipMigrationFolder.quip_migration_folder_id
+    
+    # A primary key read of one timestamp, so validating never touches html_content
+    when_updated = db.session.execute(db.select(column).where(id_column == resolved.id)).scalar()
+    if when_updated is None:
+        return None
+    
+    parts = [variant, *map(str, resolved), when_updated.isoformat()]
+    etag = hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()[:32]
+    return Validators(etag, when_updated if last_modified else None)
+
+def is_not_modified(validators):
+    """Whether the request's If-None-Match / If-Modified-Since still match, so a 304 can be sent"""
+    if validators is None or request.method not in ('GET', 'HEAD'):
+        return False
+    return not is_resource_modified(request.environ, etag=validators.etag, last_modified=validators.last_modified)
+
+def not_modified(validators):
+    """Build an empty 304 response carrying the validators"""
+    return add_validators(current_app.response_class(status=304), validators)
+
+def add_validators(response, validators):
+    """Set ETag, Last-Modified and Cache-Control on a successful response"""
+    if validators is not None and response.status_code in (200, 304):
+        response.set_etag(validators.etag)
+        if validators.last_modified is not None:
+            response.last_modified = validators.last_modified
+        else:
+            # ETag-only variants also drop the Last-Modified send_file derives from the cached file
+            response.headers.pop('Last-Modified', None)
+        response.headers['Cache-Control'] = current_app.config['HTTP_CACHE_CONTROL']
+    return response
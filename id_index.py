@@ -0,0 +1,206 @@
+"""In-memory sorted index of Quip and Google Drive ids for prefix and typo-tolerant suggestions"""
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from flask import current_app
+from models import db, QuipMigrationFile, QuipMigrationFolder
+
+# Which id columns each search type suggests from; the tag stored per id is the position here
+ID_SOURCES = [
+    ('quip', QuipMigrationFile.quip_id),
+    ('quip', QuipMigrationFolder.quip_id),
+    ('google', QuipMigrationFile.google_drive_id),
+    ('google', QuipMigrationFolder.google_drive_id),
+]
+
+_lock = threading.Lock()
+# Held while the index is built on a request, so concurrent first callers load the ids once
+_build_lock = threading.Lock()
+_index = None
+_expires_at = 0.0
+_refreshing = False
+# Bumped by invalidate_index, so a refresh that started before it cannot swap in old ids
+_generation = 0
+
+class IdIndex:
+    """Every id sorted once, so prefixes are a bisect away and typo candidates a short scan"""
+    
+    def __init__(self, ids, tags):
+        self.ids = ids
+        self.tags = tags
+    
+    @classmethod
+    def build(cls):
+        """Load every non-empty id from the files and folders tables"""
+        pairs = []
+        for tag, (_, column) in enumerate(ID_SOURCES):
+            ids = db.session.execute(db.select(column).where(column.isnot(None))).scalars()
+            pairs.extend((document_id, tag) for document_id in ids if document_id)
+        
+        pairs.sort()
+        return cls([document_id for document_id, _ in pairs], array('b', (tag for _, tag in pairs)))
+    
+    def __len__(self):
+        return len(self.ids)
+    
+    def _block(self, prefix):
+        """Return the [start, end) range of ids starting with prefix"""
+        start = bisect_left(self.ids, prefix)
+        # Every id starting with prefix sorts below prefix followed by the highest code point
+        end = bisect_left(self.ids, prefix + '\U0010ffff', start)
+        return start, end
+    
+    def _matches(self, position, search_type):
+        return search_type == 'any' or ID_SOURCES[self.tags[position]][0] == search_type
+    
+    def suggest(self, fragment, search_type='any', limit=10, max_typos=2, scan_limit=1000):
+        """Return up to limit (id, search_type, distance) tuples, exact prefixes first
+        
+        Typo candidates come from the smallest block sharing a prefix with the
+        fragment that holds at most scan_limit ids, so a typo in the first
+        characters of a very common prefix is not found.
+        """
+        suggestions = []
+        seen = set()
+        
+        def add(position, distance):
+            key = (self.ids[position], ID_SOURCES[self.tags[position]][0])
+            if key not in seen:
+                seen.add(key)
+                suggestions.append(key + (distance,))
+        
+        start, end = self._block(fragment)
+        for position in range(start, end):
+            if len(suggestions) >= limit:
+                return suggestions
+            if self._matches(position, search_type):
+                add(position, 0)
+        
+        # Shorten the shared prefix until the block is as large as we are willing to scan
+        shared = len(fragment) - 1
+        while shared > 0:
+            block_start, block_end = self._block(fragment[:shared])
+            if block_end - block_start > scan_limit:
+                break
+            start, end = block_start, block_end
+            shared -= 1
+        
+        # Very short or very common fragments leave nothing small enough to scan
+        if end - start > scan_limit:
+            return suggestions
+        
+        fuzzy = []
+        for position in range(start, end):
+            if not self._matches(position, search_type):
+                continue
+            distance = prefix_distance(fragment, self.ids[position], max_typos)
+            if 0 < distance <= max_typos:
+                fuzzy.append((distance, self.ids[position], position))
+        
+        for distance, _, position in sorted(fuzzy)[:limit - len(suggestions)]:
+            add(position, distance)
+        
+        return suggestions
+
+def prefix_distance(fragment, candidate, max_distance):
+    """Edit distance between fragment and the closest prefix of candidate, or max_distance + 1 if it exceeds it"""
+    # Banded Levenshtein: only cells within max_distance of the diagonal can stay in bounds
+    too_far = max_distance + 1
+    previous = list(range(len(candidate) + 1))
+    
+    for i, char in enumerate(fragment, 1):
+        low = max(1, i - max_distance)
+        high = min(len(candidate), i + max_distance)
+        if low > high:
+            # The fragment is already longer than the candidate plus the allowed insertions
+            return too_far
+        
+        current = [too_far] * (len(candidate) + 1)
+        current[0] = i
+        
+        for j in range(low, high + 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char != candidate[j - 1])
+            )
+        
+        # Every later row only grows, so stop once the whole band is out of bounds
+        if min(current[max(0, low - 1):high + 1]) > max_distance:
+            return too_far
+        previous = current
+    
+    # The fragment may end anywhere in the candidate, so take the best prefix length
+    return min(min(previous), too_far)
+
+def _store(index, generation, app):
+    """Swap a freshly built index in, unless it was invalidated while building"""
+    global _index, _expires_at
+    
+    with _lock:
+        if generation == _generation:
+            _index = index
+            _expires_at = time.monotonic() + app.config['ID_INDEX_TTL']
+        return _index or index
+
+def _refresh(app, generation):
+    global _refreshing
+    
+    with app.app_context():
+        try:
+            _store(IdIndex.build(), generation, app)
+        except Exception as e:
+            # Keep serving the old index and try again on a later request
+            app.logger.warning('Id index not refreshed: %s', e)
+        finally:
+            with _lock:
+                _refreshing = False
+
+def get_index():
+    """Return the cached index, reloading it in the background once the TTL has expired
+    
+    Callers keep getting the expired index until the new one is swapped in;
+    only the very first build (or one after invalidate_index) blocks.
+    """
+    global _refreshing
+    
+    with _lock:
+        index = _index
+        generation = _generation
+        if index is not None:
+            if time.monotonic() >= _expires_at and not _refreshing:
+                _refreshing = True
+                threading.Thread(
+                    target=_refresh, args=(current_app._get_current_object(), generation),
+                    name='id-index-refresh', daemon=True
+                ).start()
+            return index
+    
+    # Concurrent callers wait on the build lock so only one of them loads the ids
+    with _build_lock:
+        with _lock:
+            if _index is not None:
+                return _index
+            generation = _generation
+        return _store(IdIndex.build(), generation, current_app)
+
+def warm_index(app):
+    """Build the index in a background thread so the first suggestion is fast"""
+    def build():
+        with app.app_context():
+            try:
+                get_index()
+            except Exception as e:
+                # The tables may not exist until a dump has been imported
+                app.logger.info('Id index not built: %s', e)
+    
+    threading.Thread(target=build, name='id-index', daemon=True).start()
+
+def invalidate_index():
+    """Drop the cached index, e.g. after the dump has been re-imported"""
+    global _index, _generation
+    
+    with _lock:
+        _index = None
+        _generation += 1
@@ -0,0 +1,144 @@
+"""Content-addressed store for images pulled out of inline base64 data URIs"""
+import base64
+import binascii
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from flask import current_app
+
+# src="data:image/...;base64,..." in either quote style; base64 may be wrapped over several lines
+INLINE_IMAGE = re.compile(
+    r'''(\bsrc\s*=\s*)(["'])data:image/([\w.+-]+);base64,([A-Za-z0-9+/=\s]*)\2''',
+    re.IGNORECASE
+)
+
+# Image types stored, by data URI subtype, and the extension they are stored under.
+# SVG stays inline: it can carry script, which must never be served from the app's origin
+IMAGE_EXTENSIONS = {
+    'png': 'png',
+    'jpeg': 'jpg',
+    'jpg': 'jpg',
+    'gif': 'gif',
+    'webp': 'webp',
+    'bmp': 'bmp'
+}
+
+# Names handed out by store_image, which the image route also validates against
+IMAGE_FILENAME = re.compile(r'^[0-9a-f]{64}\.(?:png|jpg|gif|webp|bmp)$')
+
+_lock = threading.Lock()
+# Bytes this process has stored since the store was last checked against its size limit
+_stored_since_evict = [0]
+
+def image_path(filename):
+    """Return the absolute path an image is stored at, sharded by the first two hex digits of its hash"""
+    # Absolute, since converters may run pandoc from a different working directory
+    return os.path.join(os.path.abspath(current_app.config['IMAGE_STORE_DIR']), filename[:2], filename)
+
+def store_image(data, extension):
+    """Store image bytes once under their SHA-256 and return the stored file name"""
+    filename = f'{hashlib.sha256(data).hexdigest()}.{extension}'
+    path = image_path(filename)
+    
+    # The same image in another document (or an earlier restore) is already stored;
+    # touch it so eviction treats it as recently used
+    try:
+        os.utime(path)
+        return filename
+    except FileNotFoundError:
+        pass
+    
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    
+    # Write under a temporary name first so readers never see a partial file
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.partial')
+    try:
+        with os.fdopen(fd, 'wb') as temp_file:
+            temp_file.write(data)
+        os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    
+    _maybe_evict(len(data))
+    return filename
+
+def _maybe_evict(stored_bytes):
+    # Walking the store is not free, so only check the limit after a tenth of it has been written
+    max_bytes = current_app.config['IMAGE_STORE_MAX_BYTES']
+    with _lock:
+        _stored_since_evict[0] += stored_bytes
+        if _stored_since_evict[0] < max_bytes // 10:
+            return
+        _stored_since_evict[0] = 0
+    evict(max_bytes)
+
+def _entries(store_dir):
+    """List (mtime, size, path) for every complete image in the store"""
+    entries = []
+    for directory, _, filenames in os.walk(store_dir):
+        for filename in filenames:
+            if IMAGE_FILENAME.match(filename):
+                path = os.path.join(directory, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+    return entries
+
+def evict(max_bytes):
+    """Delete least recently used images until the store fits in max_bytes, returning how many were deleted
+    
+    Restoring a document again re-extracts any of its images that were evicted.
+    """
+    store_dir = os.path.abspath(current_app.config['IMAGE_STORE_DIR'])
+    if not os.path.isdir(store_dir):
+        return 0
+    
+    entries = sorted(_entries(store_dir))
+    total_bytes = sum(size for _, size, _ in entries)
+    evicted = 0
+    
+    for _, size, path in entries:
+        if total_bytes <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total_bytes -= size
+        evicted += 1
+    return evicted
+
+def extract_images(html_content, src_for):
+    """Move inline base64 images into the store in one pass over the HTML
+    
+    src_for(filename) returns the src that replaces each data URI, e.g. a
+    URL or a local path. Returns (html, images extracted). Images of other
+    types or with invalid base64 stay inline.
+    """
+    extracted = [0]
+    
+    def replace(match):
+        extension = IMAGE_EXTENSIONS.get(match.group(3).lower())
+        if extension is None:
+            return match.group(0)
+        
+        try:
+            data = base64.b64decode(''.join(match.group(4).split()), validate=True)
+        except (binascii.Error, ValueError):
+            return match.group(0)
+        
+        extracted[0] += 1
+        return f'{match.group(1)}{match.group(2)}{src_for(store_image(data, extension))}{match.group(2)}'
+    
+    # Cheap check first, since most documents have no inline images
+    if 'base64,' not in html_content:
+        return html_content, 0
+    
+    return INLINE_IMAGE.sub(replace, html_content), extracted[0]
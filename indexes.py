@@ -0,0 +1,99 @@
+"""Managed indexes for the migration tables and a query-plan check for the API lookups"""
+import resolver
+import search
+import folder_tree
+import access_index
+import serializers
+from models import db, QuipMigrationFile, QuipMigrationFolder, MigrationLog, FolderTreeEntry, DocumentAccess
+
+# Tables whose indexes are declared in models.py but not created by the SQL dump
+MANAGED_TABLES = [QuipMigrationFile, QuipMigrationFolder, MigrationLog]
+
+def ensure_indexes():
+    """Create any declared index that does not exist yet, returning the names created"""
+    created = []
+    inspector = db.inspect(db.engine)
+    
+    for model in MANAGED_TABLES:
+        # Tables only appear once a dump has been imported
+        if not inspector.has_table(model.__tablename__):
+            continue
+        
+        existing = {index['name'] for index in inspector.get_indexes(model.__tablename__)}
+        
+        for index in sorted(model.__table__.indexes, key=lambda index: index.name):
+            if index.name not in existing:
+                index.create(db.engine)
+                created.append(index.name)
+    
+    # The search vector is generated from the dump's columns rather than declared on the model
+    created.extend(search.ensure_search_index())
+    
+    # Refresh planner statistics so the new indexes are picked up immediately
+    with db.engine.begin() as connection:
+        for model in MANAGED_TABLES:
+            if inspector.has_table(model.__tablename__):
+                connection.execute(db.text(f'ANALYZE {model.__tablename__}'))
+    
+    return created
+
+def drop_managed_indexes():
+    """Drop the declared indexes so bulk loads do not maintain them row by row"""
+    with db.engine.begin() as connection:
+        for model in MANAGED_TABLES:
+            for index in model.__table__.indexes:
+                connection.execute(db.text(f'DROP INDEX IF EXISTS {index.name}'))
+    
+    if search.is_supported():
+        search.drop_search_index()
+
+def plan_check_queries():
+    """Representative statements for each endpoint that must be served by an index"""
+    sample_id = 'plan-check'
+    
+    queries = {
+        # The statements the serializer runs for offset and cursor pages
+        'get_google_drive_files': serializers.google_drive_files_statement().order_by(
+            QuipMigrationFile.quip_id
+        ).limit(50),
+        'get_google_drive_files_by_cursor': serializers.google_drive_files_statement().where(
+            db.tuple_(QuipMigrationFile.quip_id, QuipMigrationFile.quip_migration_file_id) > db.tuple_(sample_id, 0)
+        ).order_by(
+            QuipMigrationFile.quip_id, QuipMigrationFile.quip_migration_file_id
+        ).limit(51),
+        'resolve_document (quip)': resolver.lookup_statement(sample_id, 'quip'),
+        'resolve_document (google)': resolver.lookup_statement(sample_id, 'google'),
+        'resolve_document (any)': resolver.lookup_statement(sample_id, 'any'),
+        'get_migration_logs': MigrationLog.query.order_by(MigrationLog.created_at.desc()).limit(100).statement
+    }
+    
+    # The folder tree only exists once an import has built it
+    if db.inspect(db.engine).has_table(FolderTreeEntry.__tablename__):
+        queries['get_folder_children'] = folder_tree.children_statement(0, 51)
+        queries['get_folder_files'] = folder_tree.files_under_statement(0, 51, (sample_id, 0))
+        queries['get_document_ancestors'] = folder_tree.ancestors_statement('file', 0)
+    
+    if db.inspect(db.engine).has_table(DocumentAccess.__tablename__):
+        queries['get_user_documents'] = access_index.user_documents_statement(sample_id, 'file', 51, (sample_id, 0))
+    
+    if search.is_supported():
+        queries['search_text'] = search.search_statement(sample_id)
+    
+    return queries
+
+def check_query_plans():
+    """EXPLAIN every plan-check query and return {name: (uses_index, plan)}"""
+    results = {}
+    
+    with db.engine.connect() as connection:
+        with connection.begin():
+            # With seq scans disabled the planner still falls back to one when no
+            # usable index exists, so this checks the indexes rather than the table size
+            connection.execute(db.text('SET LOCAL enable_seqscan = off'))
+            
+            for name, statement in plan_check_queries().items():
+                sql = str(statement.compile(dialect=connection.dialect, compile_kwargs={'literal_binds': True}))
+                plan = '\n'.join(row[0] for row in connection.execute(db.text(f'EXPLAIN {sql}')))
+                results[name] = ('Seq Scan' not in plan, plan)
+    
+    return results
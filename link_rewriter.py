@@ -0,0 +1,234 @@
+"""Rewrite quip.com links in restored HTML to the migrated Google Drive documents"""
+import itertools
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from flask import current_app
+from html_cleaner import clean_quip_document
+from models import db, QuipMigrationFile, QuipMigrationFolder
+
+# quip.com and company subdomain links to a thread or folder, with an optional title slug, query and fragment.
+# Blob URLs only borrow the origin of the page that created them, so they are never thread links
+QUIP_LINK = re.compile(
+    r'''(?<!blob:)(?<!blob:http:)(?<!blob:https:)(?:https?:)?//(?:[\w-]+\.)*quip\.com/([A-Za-z0-9]{8,12})(?![A-Za-z0-9])'''
+    r'''(?:/[^\s"'<>?#]*)?(?:\?[^\s"'<>#]*)?(?:#[^\s"'<>]*)?'''
+)
+
+FILE_URL = 'https://docs.google.com/document/d/{}/edit'
+FOLDER_URL = 'https://drive.google.com/drive/folders/{}'
+
+# Documents sent to a rewrite worker per task, so process round trips do not dominate small documents
+REWRITE_BATCH_SIZE = 32
+
+_lock = threading.Lock()
+# Held while the map is built on a request, so concurrent first callers load the ids once
+_build_lock = threading.Lock()
+_link_map = None
+_expires_at = 0.0
+_refreshing = False
+# Bumped by invalidate_link_map, so a refresh that started before it cannot swap in old ids
+_generation = 0
+
+# The link map a rewrite worker process received from its parent
+_worker_map = None
+
+class LinkMap:
+    """Quip thread ids and secret paths mapped to the Google Drive id each was migrated to"""
+    
+    def __init__(self, drive_ids, folder_keys, version):
+        self.drive_ids = drive_ids
+        self.folder_keys = folder_keys
+        self.version = version
+    
+    @classmethod
+    def build(cls):
+        """Load every migrated file and folder id in two streamed queries"""
+        drive_ids = {}
+        folder_keys = set()
+        
+        files = db.select(
+            QuipMigrationFile.quip_id, QuipMigrationFile.quip_secret_path, QuipMigrationFile.google_drive_id
+        ).where(QuipMigrationFile.google_drive_id.isnot(None)).execution_options(yield_per=10000)
+        for quip_id, secret_path, google_drive_id in db.session.execute(files):
+            drive_ids[quip_id] = google_drive_id
+            # Shared links use the secret path rather than the thread id
+            if secret_path:
+                drive_ids[secret_path.strip('/')] = google_drive_id
+        
+        folders = db.select(
+            QuipMigrationFolder.quip_id, QuipMigrationFolder.google_drive_id
+        ).where(QuipMigrationFolder.google_drive_id.isnot(None)).execution_options(yield_per=10000)
+        for quip_id, google_drive_id in db.session.execute(folders):
+            # Files win when a folder shares an id with one
+            if quip_id not in drive_ids:
+                drive_ids[quip_id] = google_drive_id
+                folder_keys.add(quip_id)
+        
+        return cls(drive_ids, folder_keys, map_version())
+    
+    def __len__(self):
+        return len(self.drive_ids)
+    
+    def url_for(self, quip_key):
+        """Return the Google Drive URL for a Quip id or secret path, or None if it was not migrated"""
+        google_drive_id = self.drive_ids.get(quip_key)
+        if google_drive_id is None:
+            return None
+        return (FOLDER_URL if quip_key in self.folder_keys else FILE_URL).format(google_drive_id)
+    
+    def rewrite(self, html_content):
+        """Rewrite every migrated Quip link in one pass, returning (html, rewritten count, unresolved count)"""
+        counts = [0, 0]
+        
+        def replace(match):
+            url = self.url_for(match.group(1))
+            if url is None:
+                counts[1] += 1
+                return match.group(0)
+            counts[0] += 1
+            return url
+        
+        return QUIP_LINK.sub(replace, html_content), counts[0], counts[1]
+
+def map_version():
+    """Identify the migrated id set by its size and latest update, so every worker derives the same version"""
+    files = db.select(
+        db.func.count().label('files'), db.func.max(QuipMigrationFile.when_updated).label('files_updated')
+    ).where(QuipMigrationFile.google_drive_id.isnot(None)).subquery()
+    
+    folders = db.select(
+        db.func.count().label('folders'), db.func.max(QuipMigrationFolder.when_updated).label('folders_updated')
+    ).where(QuipMigrationFolder.google_drive_id.isnot(None)).subquery()
+    
+    # Each subquery yields exactly one row, so joining them on true is a cheap cross join
+    row = db.session.execute(db.select(files, folders).select_from(files.join(folders, db.true()))).one()
+    return f'{row.files}:{row.files_updated}:{row.folders}:{row.folders_updated}'
+
+def _store(link_map, generation, app):
+    """Swap a freshly built link map in, unless it was invalidated while building"""
+    global _link_map, _expires_at
+    
+    with _lock:
+        if generation == _generation:
+            _link_map = link_map
+            _expires_at = time.monotonic() + app.config['LINK_MAP_TTL']
+        return _link_map or link_map
+
+def _refresh(app, generation):
+    global _refreshing
+    
+    with app.app_context():
+        try:
+            _store(LinkMap.build(), generation, app)
+        except Exception as e:
+            # Keep serving the old map and try again on a later restore
+            app.logger.warning('Link map not refreshed: %s', e)
+        finally:
+            with _lock:
+                _refreshing = False
+
+def get_link_map():
+    """Return the cached link map, reloading it in the background once the TTL has expired
+    
+    Restores keep getting the expired map until the new one is swapped in;
+    only the very first build (or one after invalidate_link_map) blocks.
+    """
+    global _refreshing
+    
+    with _lock:
+        link_map = _link_map
+        generation = _generation
+        if link_map is not None:
+            if time.monotonic() >= _expires_at and not _refreshing:
+                _refreshing = True
+                threading.Thread(
+                    target=_refresh, args=(current_app._get_current_object(), generation),
+                    name='link-map-refresh', daemon=True
+                ).start()
+            return link_map
+    
+    # Concurrent callers wait on the build lock so only one of them loads the ids
+    with _build_lock:
+        with _lock:
+            if _link_map is not None:
+                return _link_map
+            generation = _generation
+        return _store(LinkMap.build(), generation, current_app)
+
+def warm_link_map(app):
+    """Build the link map in a background thread so the first restore is fast"""
+    def build():
+        with app.app_context():
+            try:
+                get_link_map()
+            except Exception as e:
+                # The tables may not exist until a dump has been imported
+                app.logger.info('Link map not built: %s', e)
+    
+    threading.Thread(target=build, name='link-map', daemon=True).start()
+
+def invalidate_link_map():
+    """Drop the cached link map, e.g. after the dump has been re-imported"""
+    global _link_map, _generation
+    
+    with _lock:
+        _link_map = None
+        _generation += 1
+
+def _init_worker(link_map):
+    global _worker_map
+    _worker_map = link_map
+
+def rewrite_batch_job(documents):
+    """Clean and rewrite a batch of (quip_id, html_content) in a worker process
+    
+    Returns a (quip_id, title, html, rewritten, unresolved) tuple per document.
+    """
+    results = []
+    for quip_id, html_content in documents:
+        cleaned_html, title = clean_quip_document(html_content)
+        rewritten_html, rewritten, unresolved = _worker_map.rewrite(cleaned_html)
+        results.append((quip_id, title, rewritten_html, rewritten, unresolved))
+    return results
+
+def rewrite_documents(documents, link_map, workers, batch_size=REWRITE_BATCH_SIZE):
+    """Clean and rewrite (quip_id, html_content) pairs in parallel, yielding results as batches finish
+    
+    The link map is sent to each worker process once, and at most twice
+    the number of workers batches are in flight at any time.
+    """
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(link_map,)) as executor:
+        remaining = (document for document in documents if document[1])
+        pending = set()
+        
+        def submit_next():
+            batch = list(itertools.islice(remaining, batch_size))
+            if batch:
+                pending.add(executor.submit(rewrite_batch_job, batch))
+            return bool(batch)
+        
+        while len(pending) < workers * 2 and submit_next():
+            pass
+        
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.remove(future)
+                yield from future.result()
+                submit_next()
+
+def write_rewritten_documents(results, output_dir):
+    """Write each rewritten document to <output_dir>/<quip_id>.html and total the link counts"""
+    os.makedirs(output_dir, exist_ok=True)
+    totals = {'documents': 0, 'rewritten': 0, 'unresolved': 0}
+    
+    for quip_id, _, rewritten_html, rewritten, unresolved in results:
+        with open(os.path.join(output_dir, f'{quip_id}.html'), 'w', encoding='utf-8') as output_file:
+            output_file.write(rewritten_html)
+        totals['documents'] += 1
+        totals['rewritten'] += rewritten
+        totals['unresolved'] += unresolved
+    
+    return totals
@@ -0,0 +1,234 @@
+"""Request, SQL, conversion and connection-pool metrics rendered in the Prometheus text format
+
+Metrics are kept per process; with several worker processes each one
+reports its own series, and Prometheus sums them across scrape targets.
+"""
+import logging
+import threading
+import time
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from models import db
+
+# Histogram bucket upper bounds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+CONVERSION_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+
+slow_query_logger = logging.getLogger('quip2gdrive.slow_queries')
+
+# Every metric adds itself here when it is created
+REGISTRY = []
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonic count per label combination"""
+    
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+    
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+    
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}')
+        return lines
+
+class Histogram:
+    """Bucketed observations per label combination"""
+    
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+    
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket (non-cumulative) counts, then the sum and count
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+    
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, labels, [("le", bound)])} {cumulative}')
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, labels, [("le", "+Inf")])} {count}')
+                lines.append(f'{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}')
+                lines.append(f'{self.name}_count{_format_labels(self.labelnames, labels)} {count}')
+        return lines
+
+class Gauge:
+    """Values read from a callback at scrape time; the callback returns {labels: value}"""
+    
+    def __init__(self, name, documentation, labelnames, callback):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+        REGISTRY.append(self)
+    
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} gauge']
+        for labels, value in sorted(self.callback().items()):
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}')
+        return lines
+
+REQUEST_LATENCY = Histogram(
+    'quip_http_request_duration_seconds', 'Request latency by endpoint',
+    ['endpoint', 'method', 'status']
+)
+REQUEST_SQL_QUERIES = Histogram(
+    'quip_http_request_sql_queries', 'SQL statements executed per request',
+    ['endpoint'], COUNT_BUCKETS
+)
+REQUEST_SQL_DURATION = Histogram(
+    'quip_http_request_sql_duration_seconds', 'Time spent in SQL per request',
+    ['endpoint']
+)
+SQL_QUERY_DURATION = Histogram(
+    'quip_sql_query_duration_seconds', 'Latency of individual SQL statements'
+)
+SLOW_QUERIES = Counter(
+    'quip_sql_slow_queries_total', 'SQL statements slower than SLOW_QUERY_THRESHOLD_MS',
+    ['endpoint']
+)
+CONVERSION_DURATION = Histogram(
+    'quip_conversion_duration_seconds', 'pandoc conversion time by converter and outcome (ok, error)',
+    ['converter', 'outcome'], CONVERSION_BUCKETS
+)
+CONVERSION_QUEUE_WAIT = Histogram(
+    'quip_conversion_queue_wait_seconds', 'Time conversions waited for a worker'
+)
+DB_POOL_CONNECTIONS = Gauge(
+    'quip_db_pool_connections', 'Database pool size and connections checked out or in overflow',
+    ['state'], lambda: {(state,): value for state, value in pool_status().items()}
+)
+CONVERSION_JOBS = Gauge(
+    'quip_conversion_jobs', 'Conversion jobs running and waiting for a worker',
+    ['state'], lambda: {}
+)
+
+def render():
+    """Render every registered metric in the Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+def _endpoint():
+    """Name the current request's route, or 'unmatched' for 404s"""
+    return request.url_rule.endpoint if request.url_rule else 'unmatched'
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the statement's own execution context: after_cursor_execute does not fire
+    # for statements that fail, so a per-connection stack would be left with stale entries
+    if context is not None:
+        context._metrics_query_start = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started_at = getattr(context, '_metrics_query_start', None)
+    if started_at is None:
+        return
+    elapsed = time.perf_counter() - started_at
+    SQL_QUERY_DURATION.observe((), elapsed)
+    
+    if not has_app_context():
+        return
+    
+    # Per-request totals, picked up by the after_request hook
+    if 'sql_queries' in g:
+        g.sql_queries += 1
+        g.sql_duration += elapsed
+    
+    threshold = current_app.config['SLOW_QUERY_THRESHOLD_MS']
+    if threshold and elapsed * 1000 >= threshold:
+        endpoint = g.get('metrics_endpoint', 'background')
+        SLOW_QUERIES.inc((endpoint,))
+        slow_query_logger.warning('%.1f ms in %s: %s', elapsed * 1000, endpoint, ' '.join(statement.split())[:1000])
+
+def pool_status():
+    """Size, checked-out and overflow connection counts of the database pool"""
+    pool = db.engine.pool
+    # Pools without a fixed size (e.g. SQLite's) do not report these
+    if not hasattr(pool, 'checkedout'):
+        return {}
+    
+    # overflow() counts up from -size until the pool starts opening extra connections
+    return {'size': pool.size(), 'checkedout': pool.checkedout(), 'overflow': max(pool.overflow(), 0)}
+
+def init_app(app, conversion_status):
+    """Install the request hooks, SQL listeners and gauges for one app
+    
+    conversion_status() returns the conversion service status, whose
+    active and queued counts are exported as gauges.
+    """
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_start = time.perf_counter()
+        g.metrics_endpoint = _endpoint()
+        g.sql_queries = 0
+        g.sql_duration = 0.0
+    
+    @app.after_request
+    def record_request_metrics(response):
+        if 'metrics_start' not in g:
+            return response
+        
+        state = g._get_current_object()
+        labels = (state.metrics_endpoint, request.method, str(response.status_code))
+        
+        # Recorded when the response is closed so streamed exports and restores are timed to the last byte
+        def record():
+            REQUEST_LATENCY.observe(labels, time.perf_counter() - state.metrics_start)
+            REQUEST_SQL_QUERIES.observe(labels[:1], state.sql_queries)
+            REQUEST_SQL_DURATION.observe(labels[:1], state.sql_duration)
+        
+        response.call_on_close(record)
+        return response
+    
+    def conversion_jobs():
+        status = conversion_status()
+        return {('active',): status['active'], ('queued',): status['queued']}
+    
+    CONVERSION_JOBS.callback = conversion_jobs
@@ -5,6 +5,18 @@ db = SQLAlchemy()
 
 class QuipMigrationFile(db.Model):
     __tablename__ = 'quip_migration_files'
+    __table_args__ = (
+        # Lookups by quip_id and the ORDER BY quip_id listing / keyset pagination
+        db.Index('ix_quip_migration_files_quip_id', 'quip_id', 'quip_migration_file_id'),
+        db.Index(
+            'ix_quip_migration_files_migrated_quip_id', 'quip_id', 'quip_migration_file_id',
+            postgresql_where=db.text('google_drive_id IS NOT NULL')
+        ),
+        db.Index(
+            'ix_quip_migration_files_google_drive_id', 'google_drive_id',
+            postgresql_where=db.text('google_drive_id IS NOT NULL')
+        ),
+    )
     
     quip_migration_file_id = db.Column(db.BigInteger, primary_key=True)
     quip_id = db.Column(db.Text, nullable=False)
@@ -15,21 +27,41 @@ class QuipMigrationFile(db.Model):
     when_links_fixed = db.Column(db.DateTime)
     when_quip_last_edited = db.Column(db.DateTime)
     when_quip_created = db.Column(db.DateTime)
-    parent_folders = db.Column(db.ARRAY(db.Text), nullable=False)
+    # Large columns are deferred so they are only loaded where they are serialized
+    parent_folders = db.deferred(db.Column(db.ARRAY(db.Text), nullable=False), group='permissions')
     document_type = db.Column(db.Text)
-    html_content = db.Column(db.Text)
+    html_content = db.deferred(db.Column(db.Text))
     author = db.Column(db.Text)
-    owners = db.Column(db.ARRAY(db.Text), nullable=False)
-    editors = db.Column(db.ARRAY(db.Text), nullable=False)
-    commenters = db.Column(db.ARRAY(db.Text), nullable=False)
-    viewers = db.Column(db.ARRAY(db.Text), nullable=False)
+    owners = db.deferred(db.Column(db.ARRAY(db.Text), nullable=False), group='permissions')
+    editors = db.deferred(db.Column(db.ARRAY(db.Text), nullable=False), group='permissions')
+    commenters = db.deferred(db.Column(db.ARRAY(db.Text), nullable=False), group='permissions')
+    viewers = db.deferred(db.Column(db.ARRAY(db.Text), nullable=False), group='permissions')
     when_updated = db.Column(db.DateTime)
     
     def __repr__(self):
         return f'<QuipMigrationFile {self.quip_id}: {self.obfuscated_name}>'
 
+# Columns serialized by the list and search endpoints
+FILE_SUMMARY_COLUMNS = (
+    QuipMigrationFile.quip_migration_file_id,
+    QuipMigrationFile.quip_id,
+    QuipMigrationFile.google_drive_id,
+    QuipMigrationFile.obfuscated_name,
+    QuipMigrationFile.document_type,
+    QuipMigrationFile.author,
+    QuipMigrationFile.when_quip_created,
+    QuipMigrationFile.when_migration_completed
+)
+
 class QuipMigrationFolder(db.Model):
     __tablename__ = 'quip_migration_folders'
+    __table_args__ = (
+        db.Index('ix_quip_migration_folders_quip_id', 'quip_id'),
+        db.Index(
+            'ix_quip_migration_folders_google_drive_id', 'google_drive_id',
+            postgresql_where=db.text('google_drive_id IS NOT NULL')
+        ),
+    )
     
     quip_migration_folder_id = db.Column(db.BigInteger, primary_key=True)
     quip_id = db.Column(db.Text, nullable=False)
@@ -44,6 +76,54 @@ class QuipMigrationFolder(db.Model):
     def __repr__(self):
         return f'<QuipMigrationFolder {self.quip_id}: {self.obfuscated_name}>'
 
+# Columns serialized by the list and search endpoints
+FOLDER_SUMMARY_COLUMNS = (
+    QuipMigrationFolder.quip_migration_folder_id,
+    QuipMigrationFolder.quip_id,
+    QuipMigrationFolder.google_drive_id,
+    QuipMigrationFolder.obfuscated_name,
+    QuipMigrationFolder.when_migration_completed,
+    QuipMigrationFolder.parent_folder,
+    QuipMigrationFolder.inherit_mode
+)
+
+class FolderTreeEntry(db.Model):
+    """Closure table of the folder hierarchy, rebuilt from parent_folder/parent_folders after each import"""
+    __tablename__ = 'quip_folder_tree'
+    __table_args__ = (
+        # Children of a folder, and everything under it ordered for keyset pagination
+        db.Index('ix_quip_folder_tree_children', 'ancestor_id', 'depth', 'descendant_kind', 'descendant_quip_id'),
+        db.Index('ix_quip_folder_tree_subtree', 'ancestor_id', 'descendant_kind', 'descendant_quip_id', 'descendant_id'),
+        # Ancestors of a file or folder
+        db.Index('ix_quip_folder_tree_ancestors', 'descendant_kind', 'descendant_id', 'depth'),
+    )
+    
+    ancestor_id = db.Column(db.BigInteger, primary_key=True)  # quip_migration_folder_id
+    descendant_kind = db.Column(db.Text, primary_key=True)  # file, folder
+    descendant_id = db.Column(db.BigInteger, primary_key=True)  # quip_migration_file_id or quip_migration_folder_id
+    descendant_quip_id = db.Column(db.Text, nullable=False)
+    depth = db.Column(db.Integer, nullable=False)  # 0 for the folder itself, 1 for direct children
+    
+    def __repr__(self):
+        return f'<FolderTreeEntry {self.ancestor_id} -> {self.descendant_kind} {self.descendant_id}>'
+
+class DocumentAccess(db.Model):
+    """Who can access each file and folder, normalized from the permission arrays after each import"""
+    __tablename__ = 'quip_document_access'
+    __table_args__ = (
+        # A user's documents of one kind in (quip_id, id) order for keyset pagination
+        db.Index('ix_quip_document_access_user', 'user_id', 'document_kind', 'quip_id', 'document_id'),
+    )
+    
+    user_id = db.Column(db.Text, primary_key=True)
+    document_kind = db.Column(db.Text, primary_key=True)  # file, folder
+    document_id = db.Column(db.BigInteger, primary_key=True)  # quip_migration_file_id or quip_migration_folder_id
+    quip_id = db.Column(db.Text, nullable=False)
+    role = db.Column(db.Text, nullable=False)  # owner, editor, commenter, viewer for files; member for folders
+    
+    def __repr__(self):
+        return f'<DocumentAccess {self.user_id}: {self.role} of {self.document_kind} {self.document_id}>'
+
 class GoogleDriveFile(db.Model):
     __tablename__ = 'google_drive_files'
     
@@ -59,6 +139,9 @@ class GoogleDriveFile(db.Model):
 
 class MigrationLog(db.Model):
     __tablename__ = 'migration_logs'
+    __table_args__ = (
+        db.Index('ix_migration_logs_created_at', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     document_id = db.Column(db.String(255), nullable=False)
@@ -0,0 +1,148 @@
+"""Resolve Quip and Google Drive ids to files or folders with one indexed query and an LRU cache"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from flask import current_app
+from models import db, QuipMigrationFile, QuipMigrationFolder, FILE_SUMMARY_COLUMNS, FOLDER_SUMMARY_COLUMNS
+
+ResolvedDocument = namedtuple('ResolvedDocument', ['id', 'kind', 'quip_id', 'google_drive_id', 'name'])
+
+# Which id columns each lookup mode matches, in priority order
+LOOKUP_BRANCHES = {
+    'quip': [('file', 'quip_id'), ('folder', 'quip_id')],
+    'google': [('file', 'google_drive_id'), ('folder', 'google_drive_id')],
+    'any': [('file', 'google_drive_id'), ('file', 'quip_id'), ('folder', 'google_drive_id'), ('folder', 'quip_id')]
+}
+
+class LRUCache:
+    """Thread-safe bounded LRU cache whose entries also expire after a TTL"""
+    
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        """Return (hit, value) for a key, dropping it if it has expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            
+            value, expires_at = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                return False, None
+            
+            self._entries.move_to_end(key)
+            return True, value
+    
+    def set(self, key, value, max_size, ttl):
+        """Store a value, evicting the least recently used entries beyond max_size"""
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+_cache = LRUCache()
+
+def _lookup_branch(kind, column_name, document_id, priority):
+    """Build one indexed SELECT of the UNION ALL lookup; document_id may be a list of ids"""
+    if kind == 'file':
+        model, id_column = QuipMigrationFile, QuipMigrationFile.quip_migration_file_id
+    else:
+        model, id_column = QuipMigrationFolder, QuipMigrationFolder.quip_migration_folder_id
+    
+    column = getattr(model, column_name)
+    return db.select(
+        id_column.label('id'),
+        db.literal(kind).label('kind'),
+        model.quip_id.label('quip_id'),
+        model.google_drive_id.label('google_drive_id'),
+        model.obfuscated_name.label('name'),
+        db.literal(priority).label('priority'),
+        column.label('matched_id')
+    ).where(column.in_(document_id) if isinstance(document_id, list) else column == document_id)
+
+def lookup_statement(document_id, mode='any'):
+    """Build the UNION ALL statement returning the best match for an id"""
+    # Every branch is an equality match on an indexed column, unlike a single OR filter
+    branches = [
+        _lookup_branch(kind, column_name, document_id, priority)
+        for priority, (kind, column_name) in enumerate(LOOKUP_BRANCHES[mode])
+    ]
+    lookup = db.union_all(*branches).subquery()
+    
+    return db.select(
+        lookup.c.id, lookup.c.kind, lookup.c.quip_id, lookup.c.google_drive_id, lookup.c.name
+    ).order_by(lookup.c.priority).limit(1)
+
+def resolve_document(document_id, mode='any'):
+    """Resolve an id to a ResolvedDocument (files before folders), or None if it does not exist"""
+    key = (mode, document_id)
+    hit, resolved = _cache.get(key)
+    if hit:
+        return resolved
+    
+    row = db.session.execute(lookup_statement(document_id, mode)).first()
+    
+    resolved = ResolvedDocument(*row) if row else None
+    
+    # Misses are cached too; imports clear the cache and the TTL bounds staleness
+    # in worker processes that did not run the import
+    _cache.set(
+        key, resolved,
+        current_app.config['RESOLVER_CACHE_SIZE'],
+        current_app.config['RESOLVER_CACHE_TTL']
+    )
+    return resolved
+
+def resolve_documents(document_ids, mode='any'):
+    """Resolve several ids with one query, returning {document_id: ResolvedDocument or None}"""
+    results = {}
+    misses = []
+    for document_id in document_ids:
+        hit, resolved = _cache.get((mode, document_id))
+        if hit:
+            results[document_id] = resolved
+        else:
+            misses.append(document_id)
+    
+    if misses:
+        branches = [
+            _lookup_branch(kind, column_name, misses, priority)
+            for priority, (kind, column_name) in enumerate(LOOKUP_BRANCHES[mode])
+        ]
+        lookup = db.union_all(*branches).subquery()
+        rows = db.session.execute(db.select(lookup).order_by(lookup.c.priority.desc())).all()
+        
+        # Rows come lowest priority first, so the best match for each id is written last
+        found = {row.matched_id: ResolvedDocument(row.id, row.kind, row.quip_id, row.google_drive_id, row.name) for row in rows}
+        
+        for document_id in misses:
+            results[document_id] = found.get(document_id)
+            _cache.set(
+                (mode, document_id), results[document_id],
+                current_app.config['RESOLVER_CACHE_SIZE'],
+                current_app.config['RESOLVER_CACHE_TTL']
+            )
+    
+    return results
+
+def load_document(resolved, include_content=False):
+    """Load the summary columns (and optionally html_content) of a resolved file or folder by primary key"""
+    if resolved.kind == 'file':
+        options = [db.load_only(*FILE_SUMMARY_COLUMNS)]
+        if include_content:
+            options.append(db.undefer(QuipMigrationFile.html_content))
+        return db.session.get(QuipMigrationFile, resolved.id, options=options)
+    
+    return db.session.get(QuipMigrationFolder, resolved.id, options=[db.load_only(*FOLDER_SUMMARY_COLUMNS)])
+
+def invalidate_cache():
+    """Forget every cached resolution, e.g. after the dump has been re-imported"""
+    _cache.clear()
@@ -0,0 +1,127 @@
+"""Ranked full-text search over document names and content"""
+from models import db
+
+SEARCH_CONFIG = 'english'
+SEARCH_INDEX = 'ix_quip_migration_files_search_vector'
+
+# Only the start of very large documents is indexed, which keeps every
+# vector well below PostgreSQL's 1 MB tsvector limit
+SEARCH_CONTENT_CHARS = 500000
+
+# Snippets are highlighted in this much of the start of each document, so building them
+# costs the same for every document size; matches further in get the document's opening
+SEARCH_SNIPPET_CHARS = 4000
+
+# Names rank above content; the default parser drops HTML tags and entities
+SEARCH_VECTOR_SQL = (
+    f"setweight(to_tsvector('{SEARCH_CONFIG}'::regconfig, coalesce(obfuscated_name, '')), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}'::regconfig, left(coalesce(html_content, ''), {SEARCH_CONTENT_CHARS})), 'D')"
+)
+
+SEARCH_SQL = f'''
+    WITH query AS (
+        SELECT websearch_to_tsquery('{SEARCH_CONFIG}', :q) AS q
+    ),
+    candidates AS (
+        SELECT f.quip_migration_file_id, f.search_vector
+        FROM quip_migration_files AS f CROSS JOIN query
+        WHERE f.search_vector @@ query.q
+        LIMIT :max_candidates
+    ),
+    matches AS (
+        SELECT candidates.quip_migration_file_id, ts_rank_cd(candidates.search_vector, query.q) AS rank
+        FROM candidates CROSS JOIN query
+        ORDER BY rank DESC, candidates.quip_migration_file_id
+        LIMIT :max_results
+    ),
+    page AS (
+        SELECT quip_migration_file_id, rank
+        FROM matches
+        ORDER BY rank DESC, quip_migration_file_id
+        LIMIT :limit OFFSET :offset
+    )
+    SELECT
+        totals.total,
+        totals.candidates,
+        page.rank,
+        f.quip_migration_file_id,
+        f.quip_id,
+        f.google_drive_id,
+        f.obfuscated_name,
+        f.document_type,
+        f.author,
+        f.when_quip_created,
+        f.when_migration_completed,
+        ts_headline(
+            '{SEARCH_CONFIG}',
+            regexp_replace(left(f.html_content, {SEARCH_SNIPPET_CHARS}), '<[^>]*>', ' ', 'g'),
+            query.q,
+            'StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=20, MinWords=5'
+        ) AS snippet
+    FROM (SELECT (SELECT count(*) FROM matches) AS total, (SELECT count(*) FROM candidates) AS candidates) AS totals
+    CROSS JOIN query
+    LEFT JOIN page ON true
+    LEFT JOIN quip_migration_files AS f ON f.quip_migration_file_id = page.quip_migration_file_id
+    ORDER BY page.rank DESC, page.quip_migration_file_id
+'''
+
+def is_supported():
+    """Full-text search needs PostgreSQL"""
+    return db.engine.dialect.name == 'postgresql'
+
+def ensure_search_index():
+    """Add the generated search_vector column and its GIN index if missing, returning what was created
+
+    The column is generated, so PostgreSQL fills it for every row a full or
+    delta import writes and keeps it current on updates.
+    """
+    created = []
+    if not is_supported():
+        return created
+    
+    with db.engine.begin() as connection:
+        # Inspect through the same connection, which holds the ALTER TABLE lock
+        inspector = db.inspect(connection)
+        if not inspector.has_table('quip_migration_files'):
+            return created
+        
+        columns = {column['name'] for column in inspector.get_columns('quip_migration_files')}
+        if 'search_vector' not in columns:
+            connection.execute(db.text(
+                f'ALTER TABLE quip_migration_files ADD COLUMN search_vector tsvector '
+                f'GENERATED ALWAYS AS ({SEARCH_VECTOR_SQL}) STORED'
+            ))
+            created.append('quip_migration_files.search_vector')
+        
+        indexes = {index['name'] for index in inspector.get_indexes('quip_migration_files')}
+        if SEARCH_INDEX not in indexes:
+            connection.execute(db.text(
+                f'CREATE INDEX {SEARCH_INDEX} ON quip_migration_files USING gin (search_vector)'
+            ))
+            created.append(SEARCH_INDEX)
+    
+    return created
+
+def drop_search_index():
+    """Drop the GIN index so bulk loads do not maintain it row by row"""
+    with db.engine.begin() as connection:
+        connection.execute(db.text(f'DROP INDEX IF EXISTS {SEARCH_INDEX}'))
+
+def search_statement(q, page=1, per_page=20, max_results=2000, max_candidates=5000):
+    """Build the ranked search statement for one page of results"""
+    return db.text(SEARCH_SQL).bindparams(
+        q=q, max_results=max_results, max_candidates=max_candidates, limit=per_page, offset=(page - 1) * per_page
+    )
+
+def search_documents(q, page=1, per_page=20, max_results=2000, max_candidates=5000):
+    """Return (total, capped, rows) for one page of results ranked by relevance
+
+    At most max_candidates matches are ranked and only the max_results
+    best of them are paged through, which bounds the cost of very common
+    terms. total is capped at max_results, and capped tells whether either
+    limit cut the matches short.
+    """
+    rows = db.session.execute(search_statement(q, page, per_page, max_results, max_candidates)).all()
+    total = rows[0].total if rows else 0
+    capped = bool(rows) and (rows[0].candidates >= max_candidates or total >= max_results)
+    return total, capped, [row for row in rows if row.quip_migration_file_id is not None]
@@ -0,0 +1,107 @@
+"""Serialize Core select rows straight to JSON responses without building ORM objects"""
+import json
+import math
+from datetime import date, datetime
+from decimal import Decimal
+from flask import current_app
+from models import db, QuipMigrationFile, QuipMigrationFolder
+
+try:
+    import orjson
+except ImportError:
+    # orjson is optional; without it responses are encoded with the standard library
+    orjson = None
+
+# Output field name and column (or SQL expression) of each serialized shape
+GOOGLE_DRIVE_FILE_FIELDS = (
+    ('id', QuipMigrationFile.quip_migration_file_id),
+    ('quip_document_id', QuipMigrationFile.quip_id),
+    ('google_drive_file_id', QuipMigrationFile.google_drive_id),
+    ('google_drive_file_name', QuipMigrationFile.obfuscated_name),
+    # Built by the database so rows need no per-row string formatting
+    ('google_drive_file_url', db.literal('https://docs.google.com/document/d/') + QuipMigrationFile.google_drive_id + db.literal('/edit')),
+    ('document_type', QuipMigrationFile.document_type),
+    ('author', QuipMigrationFile.author),
+    ('when_quip_created', QuipMigrationFile.when_quip_created),
+    ('when_migration_completed', QuipMigrationFile.when_migration_completed)
+)
+
+DOCUMENT_FILE_FIELDS = (
+    ('quip_migration_file_id', QuipMigrationFile.quip_migration_file_id),
+    ('quip_id', QuipMigrationFile.quip_id),
+    ('obfuscated_name', QuipMigrationFile.obfuscated_name),
+    ('google_drive_id', QuipMigrationFile.google_drive_id),
+    ('document_type', QuipMigrationFile.document_type),
+    ('author', QuipMigrationFile.author),
+    ('when_quip_created', QuipMigrationFile.when_quip_created),
+    ('when_migration_completed', QuipMigrationFile.when_migration_completed)
+)
+
+DOCUMENT_FOLDER_FIELDS = (
+    ('quip_migration_folder_id', QuipMigrationFolder.quip_migration_folder_id),
+    ('quip_id', QuipMigrationFolder.quip_id),
+    ('obfuscated_name', QuipMigrationFolder.obfuscated_name),
+    ('google_drive_id', QuipMigrationFolder.google_drive_id),
+    ('parent_folder', QuipMigrationFolder.parent_folder),
+    ('inherit_mode', QuipMigrationFolder.inherit_mode),
+    ('member_count', db.func.coalesce(db.func.cardinality(QuipMigrationFolder.member_ids), 0))
+)
+
+def select_fields(fields):
+    """Build a select whose result columns are labeled with the output field names"""
+    return db.select(*(column.label(name) for name, column in fields))
+
+def google_drive_files_statement():
+    """Select the /api/google-drive-files shape for every file migrated to Google Drive"""
+    return select_fields(GOOGLE_DRIVE_FILE_FIELDS).where(QuipMigrationFile.google_drive_id.isnot(None))
+
+def rows_to_dicts(result):
+    """Turn every row of a Core result into a plain dict keyed by its column labels"""
+    keys = tuple(result.keys())
+    return [dict(zip(keys, row)) for row in result]
+
+def paginate_rows(statement, page, per_page, max_per_page=None):
+    """Run one OFFSET page of a select, returning (rows as dicts, pagination fields)
+    
+    Page arguments are normalized the way Flask-SQLAlchemy's paginate()
+    does with error_out=False, and the page and per_page actually used are
+    part of the pagination fields.
+    """
+    page = max(page, 1)
+    if max_per_page is not None:
+        per_page = min(per_page, max_per_page)
+    if per_page < 1:
+        per_page = 20
+    
+    total = db.session.scalar(db.select(db.func.count()).select_from(statement.order_by(None).subquery()))
+    rows = rows_to_dicts(db.session.execute(statement.limit(per_page).offset((page - 1) * per_page)))
+    pages = math.ceil(total / per_page) if total else 0
+    
+    return rows, {
+        'page': page,
+        'per_page': per_page,
+        'total_count': total,
+        'pages': pages,
+        'has_next': page < pages,
+        'has_prev': page > 1
+    }
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    # Written as a string, as jsonify does, so no precision is lost
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+def dumps(payload):
+    """Encode a payload of dicts, lists, scalars, datetimes and Decimals to JSON bytes"""
+    if orjson is not None:
+        # orjson writes naive datetimes in the same ISO 8601 form as isoformat()
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    # Unescaped UTF-8 and no spaces, byte for byte what orjson writes
+    return json.dumps(payload, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def json_response(payload, status=200):
+    """Build a JSON response with the fast encoder; every JSON route in app.py answers through this"""
+    return current_app.response_class(dumps(payload), status=status, mimetype='application/json')
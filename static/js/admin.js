@@ -38,22 +38,89 @@ document.addEventListener('DOMContentLoaded', function() {
     });
     
     // Import dump button
-    document.getElementById('importDump').addEventListener('click', async function() {
+    const cancelImportBtn = document.getElementById('cancelImport');
+    let importJobId = null;
+    let importPollTimer = null;
+    
+    document.getElementById('importDump').addEventListener('click', () => startImport('full'));
+    document.getElementById('importDelta').addEventListener('click', () => startImport('delta'));
+    
+    async function startImport(mode) {
         try {
             const response = await fetch('/api/import-dump', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
-                }
+                },
+                body: JSON.stringify({ mode: mode })
             });
             
             const data = await response.json();
             responseArea.textContent = JSON.stringify(data, null, 2);
+            
+            // Follow the new job, or the one that is already running
+            if (data.job_id) {
+                watchImportJob(data.job_id);
+            }
+        } catch (error) {
+            responseArea.textContent = `Error: ${error.message}`;
+        }
+    }
+    
+    // Cancel import button
+    cancelImportBtn.addEventListener('click', async function() {
+        if (!importJobId) {
+            return;
+        }
+        
+        try {
+            const response = await fetch(`/api/import-jobs/${importJobId}/cancel`, { method: 'POST' });
+            const data = await response.json();
+            responseArea.textContent = JSON.stringify(data, null, 2);
         } catch (error) {
             responseArea.textContent = `Error: ${error.message}`;
         }
     });
     
+    function watchImportJob(jobId) {
+        importJobId = jobId;
+        cancelImportBtn.style.display = '';
+        clearInterval(importPollTimer);
+        pollImportJob();
+        importPollTimer = setInterval(pollImportJob, 2000);
+    }
+    
+    async function pollImportJob() {
+        try {
+            const response = await fetch(`/api/import-jobs/${importJobId}`);
+            const data = await response.json();
+            
+            if (data.status !== 'success') {
+                responseArea.textContent = `Error: ${data.message}`;
+                stopWatchingImport();
+                return;
+            }
+            
+            const job = data.job;
+            const progress = job.percent !== undefined ? `${job.percent}% (${job.bytes_processed.toLocaleString()} of ${job.bytes_total.toLocaleString()} bytes)\n\n` : '';
+            responseArea.textContent = `Import job ${job.job_id}: ${job.status}\n${progress}${JSON.stringify(job, null, 2)}`;
+            
+            if (['completed', 'failed', 'cancelled'].includes(job.status)) {
+                stopWatchingImport();
+                loadStatistics();
+            }
+        } catch (error) {
+            responseArea.textContent = `Error: ${error.message}`;
+        }
+    }
+    
+    function stopWatchingImport() {
+        clearInterval(importPollTimer);
+        importPollTimer = null;
+        importJobId = null;
+        cancelImportBtn.style.display = 'none';
+    }
+    
     // Refresh statistics button
     document.getElementById('refreshStats').addEventListener('click', function() {
         loadStatistics();
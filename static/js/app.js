@@ -42,6 +42,51 @@ document.addEventListener('DOMContentLoaded', function() {
         };
     }
     
+    // Id autocomplete: suggest matching ids as the user types
+    const searchSuggestions = document.getElementById('searchSuggestions');
+    let suggestTimer = null;
+    let suggestController = null;
+    
+    searchInput.addEventListener('input', function() {
+        clearTimeout(suggestTimer);
+        suggestTimer = setTimeout(loadSuggestions, 150);
+    });
+    
+    async function loadSuggestions() {
+        const input = searchInput.value.trim();
+        
+        // Pasted URLs and full Drive ids need no suggestions
+        if (input.length < 2 || input.includes('/')) {
+            searchSuggestions.innerHTML = '';
+            return;
+        }
+        
+        // Only the latest keystroke's request matters
+        if (suggestController) {
+            suggestController.abort();
+        }
+        suggestController = new AbortController();
+        
+        try {
+            const response = await fetch(`/api/search/suggest?q=${encodeURIComponent(input)}&limit=10`, {
+                signal: suggestController.signal
+            });
+            const data = await response.json();
+            
+            searchSuggestions.innerHTML = '';
+            (data.suggestions || []).forEach(suggestion => {
+                const option = document.createElement('option');
+                option.value = suggestion.id;
+                option.label = `${suggestion.name || ''} (${suggestion.search_type === 'google' ? 'Drive' : 'Quip'} ${suggestion.document_type})`;
+                searchSuggestions.appendChild(option);
+            });
+        } catch (error) {
+            if (error.name !== 'AbortError') {
+                console.error('Error loading suggestions:', error);
+            }
+        }
+    }
+    
     // Search functionality
     searchBtn.addEventListener('click', performSearch);
     searchInput.addEventListener('keypress', function(e) {
@@ -231,16 +276,9 @@ Member Count: ${quipDoc.member_count || 'N/A'}`;
         restoreStatus.innerHTML = `<div class="alert alert-info"><i class="bi bi-hourglass-split"></i> Converting document to ${format.toUpperCase()}...</div>`;
         
         try {
-            const response = await fetch('/api/restore-file', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({
-                    document_id: currentDocumentId,
-                    format: format
-                })
-            });
+            // GET, so the browser revalidates its cached copy with If-None-Match instead of converting again
+            const params = new URLSearchParams({ document_id: currentDocumentId, format: format });
+            const response = await fetch(`/api/restore-file?${params}`);
             
             if (response.ok) {
                 if (format === 'html') {
@@ -159,63 +159,15 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
     
-    async function exportToCSV() {
-        try {
-            // Get all files (not just current page)
-            const response = await fetch(`/api/google-drive-files?page=1&per_page=${totalFiles}`);
-            const data = await response.json();
-            
-            if (data.status === 'success') {
-                const csvContent = generateCSV(data.files);
-                downloadCSV(csvContent, 'google-drive-files.csv');
-            } else {
-                alert('Error exporting data: ' + data.message);
-            }
-        } catch (error) {
-            alert('Error exporting data: ' + error.message);
-        }
-    }
-    
-    function generateCSV(files) {
-        const headers = [
-            'ID',
-            'Quip Document ID', 
-            'Google Drive File ID',
-            'File Name',
-            'File URL',
-            'Created At',
-            'Document Type',
-            'Author',
-            'Migration Completed'
-        ];
-        
-        const rows = files.map(file => [
-            file.id,
-            file.quip_document_id || '',
-            file.google_drive_file_id || '',
-            file.google_drive_file_name || '',
-            file.google_drive_file_url || '',
-            file.when_quip_created ? new Date(file.when_quip_created).toLocaleString() : '',
-            file.document_type || '',
-            file.author || '',
-            file.when_migration_completed ? new Date(file.when_migration_completed).toLocaleString() : ''
-        ]);
-        
-        return [headers, ...rows]
-            .map(row => row.map(cell => `"${cell}"`).join(','))
-            .join('\n');
-    }
-    
-    function downloadCSV(content, filename) {
-        const blob = new Blob([content], { type: 'text/csv;charset=utf-8;' });
-        const url = URL.createObjectURL(blob);
+    function exportToCSV() {
+        // Let the browser download the server-side stream directly instead of
+        // loading every file into memory here
         const a = document.createElement('a');
-        a.href = url;
-        a.download = filename;
+        a.href = '/api/google-drive-files/export?format=csv';
+        a.download = 'google-drive-files.csv';
         document.body.appendChild(a);
         a.click();
         document.body.removeChild(a);
-        URL.revokeObjectURL(url);
     }
     
     // Global function for copying to clipboard
@@ -0,0 +1,72 @@
+"""Migration statistics computed in a single aggregate query and cached in-process"""
+import threading
+import time
+from datetime import datetime
+from flask import current_app
+from models import db, QuipMigrationFile, QuipMigrationFolder, MigrationLog
+
+_lock = threading.Lock()
+_cached_stats = None
+_expires_at = 0.0
+
+def compute_stats():
+    """Count files, folders and logs with one conditional aggregate query"""
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    
+    files = db.select(
+        db.func.count().label('total_files'),
+        db.func.count().filter(QuipMigrationFile.google_drive_id.isnot(None)).label('migrated_files')
+    ).select_from(QuipMigrationFile).subquery()
+    
+    folders = db.select(
+        db.func.count().label('total_folders'),
+        db.func.count().filter(QuipMigrationFolder.google_drive_id.isnot(None)).label('migrated_folders')
+    ).select_from(QuipMigrationFolder).subquery()
+    
+    logs = db.select(
+        db.func.count().label('total_logs'),
+        db.func.count().filter(MigrationLog.created_at >= today).label('recent_logs')
+    ).select_from(MigrationLog).subquery()
+    
+    # Each subquery yields exactly one row, so joining them on true is a cheap cross join
+    row = db.session.execute(
+        db.select(files, folders, logs).select_from(
+            files.join(folders, db.true()).join(logs, db.true())
+        )
+    ).one()
+    
+    # Anything without a google_drive_id is still pending
+    pending_files = row.total_files - row.migrated_files
+    pending_folders = row.total_folders - row.migrated_folders
+    
+    return {
+        'documents': {
+            'total': row.total_files + row.total_folders,
+            'files': row.total_files,
+            'folders': row.total_folders,
+            'migrated': row.migrated_files + row.migrated_folders,
+            'pending': pending_files + pending_folders
+        },
+        'logs': {
+            'total': row.total_logs,
+            'today': row.recent_logs
+        }
+    }
+
+def get_stats():
+    """Return cached statistics, recomputing them once the TTL has expired"""
+    global _cached_stats, _expires_at
+    
+    # Concurrent callers wait on the lock so only one of them runs the query
+    with _lock:
+        if _cached_stats is None or time.monotonic() >= _expires_at:
+            _cached_stats = compute_stats()
+            _expires_at = time.monotonic() + current_app.config['STATS_CACHE_TTL']
+        return _cached_stats
+
+def invalidate_stats():
+    """Drop the cached statistics so the next request recomputes them"""
+    global _cached_stats
+    
+    with _lock:
+        _cached_stats = None
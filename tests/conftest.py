@@ -0,0 +1,46 @@
+import os
+import sys
+import pytest
+
+# The modules live at the repository root rather than in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Tests that need PostgreSQL run against TEST_DATABASE_URL and are skipped without it.
+# app.py reads DATABASE_URL when it is imported, so it has to be set here
+if os.environ.get('TEST_DATABASE_URL'):
+    os.environ['DATABASE_URL'] = os.environ['TEST_DATABASE_URL']
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """The application in an app context, with its disk stores under a temporary directory"""
+    from app import app as flask_app
+    
+    monkeypatch.setitem(flask_app.config, 'TESTING', True)
+    monkeypatch.setitem(flask_app.config, 'IMAGE_STORE_DIR', str(tmp_path / 'images'))
+    monkeypatch.setitem(flask_app.config, 'CONVERSION_CACHE_DIR', str(tmp_path / 'conversions'))
+    
+    with flask_app.app_context():
+        yield flask_app
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def database(app):
+    """A quip_migration_files table in the TEST_DATABASE_URL database, dropped afterwards"""
+    if not os.environ.get('TEST_DATABASE_URL'):
+        pytest.skip('TEST_DATABASE_URL is not set')
+    
+    from models import db, QuipMigrationFile
+    
+    # Never drop a table the tests did not create
+    if db.inspect(db.engine).has_table(QuipMigrationFile.__tablename__):
+        pytest.skip('TEST_DATABASE_URL already has a quip_migration_files table')
+    
+    QuipMigrationFile.__table__.create(db.engine)
+    try:
+        yield db
+    finally:
+        db.session.remove()
+        QuipMigrationFile.__table__.drop(db.engine)
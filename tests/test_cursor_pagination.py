@@ -0,0 +1,97 @@
+"""Tests for keyset cursors and the cursor-paginated /api/google-drive-files"""
+import base64
+import pytest
+from app import encode_cursor, decode_cursor
+
+def test_cursor_round_trip():
+    for position in [('abc123', 1), ('', 0), ('ünïcode/+=', 2 ** 40), ('x' * 200, 7)]:
+        cursor = encode_cursor(*position)
+        assert decode_cursor(cursor) == position
+        # URL-safe and unpadded, so it can go in a query string as is
+        assert all(char.isalnum() or char in '-_' for char in cursor)
+
+@pytest.mark.parametrize('cursor', [
+    'not base64!',
+    base64.urlsafe_b64encode(b'not json').decode('ascii'),
+    base64.urlsafe_b64encode(b'["only one"]').decode('ascii'),
+    base64.urlsafe_b64encode(b'{"quip_id": "a", "id": 1}').decode('ascii'),
+    base64.urlsafe_b64encode(b'[1, 2]').decode('ascii'),
+    base64.urlsafe_b64encode(b'["a", "2"]').decode('ascii'),
+    base64.urlsafe_b64encode(b'["a", 1.5]').decode('ascii'),
+    base64.urlsafe_b64encode(b'\xff\xfe').decode('ascii'),
+])
+def test_decode_rejects_malformed_cursors(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+def test_invalid_cursor_is_a_bad_request(client):
+    response = client.get('/api/google-drive-files?cursor=not-a-cursor')
+    assert response.status_code == 400
+    assert response.get_json() == {'status': 'error', 'message': 'Invalid cursor'}
+
+def test_invalid_count_mode_is_a_bad_request(client):
+    response = client.get('/api/google-drive-files?cursor=&count=maybe')
+    assert response.status_code == 400
+
+def insert_files(db, rows):
+    from models import QuipMigrationFile
+    
+    db.session.add_all(
+        QuipMigrationFile(
+            quip_migration_file_id=row_id, quip_id=quip_id, google_drive_id=google_drive_id,
+            parent_folders=[], owners=[], editors=[], commenters=[], viewers=[]
+        )
+        for row_id, quip_id, google_drive_id in rows
+    )
+    db.session.commit()
+
+def walk_pages(client, per_page):
+    """Follow next_cursor from the first page to the last, returning every page's ids"""
+    pages = []
+    cursor = ''
+    while cursor is not None:
+        data = client.get(f'/api/google-drive-files?cursor={cursor}&per_page={per_page}&count=none').get_json()
+        assert data['status'] == 'success'
+        pages.append([file['id'] for file in data['files']])
+        cursor = data['next_cursor']
+        assert data['has_next'] == (cursor is not None)
+    return pages
+
+def test_pages_split_duplicate_quip_ids_on_the_id(client, database):
+    # Several files share a quip_id, so only the id breaks ties between them
+    insert_files(database, [
+        (5, 'b', 'drive-5'), (1, 'a', 'drive-1'), (4, 'b', 'drive-4'), (3, 'b', 'drive-3'),
+        (2, 'a', 'drive-2'), (7, 'c', 'drive-7'), (6, 'b', None), (8, 'b', 'drive-8')
+    ])
+    
+    expected = [1, 2, 3, 4, 5, 8, 7]
+    for per_page in (1, 2, 3, 7, 50):
+        pages = walk_pages(client, per_page)
+        assert [row_id for page in pages for row_id in page] == expected
+        assert all(len(page) == per_page for page in pages[:-1])
+        assert pages[-1]
+
+def test_last_full_page_has_no_next_cursor(client, database):
+    insert_files(database, [(1, 'a', 'drive-1'), (2, 'a', 'drive-2')])
+    
+    data = client.get('/api/google-drive-files?cursor=&per_page=2&count=none').get_json()
+    assert [file['id'] for file in data['files']] == [1, 2]
+    assert data['has_next'] is False
+    assert data['next_cursor'] is None
+
+def test_total_count_modes(client, database):
+    insert_files(database, [(row_id, f'q{row_id}', f'drive-{row_id}' if row_id % 4 else None) for row_id in range(1, 101)])
+    database.session.execute(database.text('ANALYZE quip_migration_files'))
+    database.session.commit()
+    
+    exact = client.get('/api/google-drive-files?cursor=&count=exact').get_json()
+    assert exact['total_count'] == 75
+    assert exact['total_count_estimated'] is False
+    
+    # Estimated from the planner statistics of the migrated rows, not the whole table
+    estimate = client.get('/api/google-drive-files?cursor=').get_json()
+    assert estimate['total_count'] == 75
+    assert estimate['total_count_estimated'] is True
+    
+    none = client.get('/api/google-drive-files?cursor=&count=none').get_json()
+    assert none['total_count'] is None
@@ -0,0 +1,64 @@
+"""Tests for splitting dump SQL into statements"""
+from dump_loader import StatementSplitter
+
+def split(*chunks):
+    splitter = StatementSplitter()
+    statements = []
+    for chunk in chunks:
+        statements.extend(splitter.feed(chunk))
+    return statements, splitter
+
+def test_splits_on_semicolons():
+    statements, splitter = split('CREATE TABLE a (id int);\nCREATE TABLE b (id int);\n')
+    assert statements == ['CREATE TABLE a (id int);', 'CREATE TABLE b (id int);']
+    assert splitter.empty
+
+def test_semicolon_inside_single_quotes():
+    statements, _ = split("INSERT INTO t VALUES ('a; b', 'it''s; here');\n")
+    assert statements == ["INSERT INTO t VALUES ('a; b', 'it''s; here');"]
+
+def test_semicolon_inside_double_quoted_identifier():
+    statements, _ = split('CREATE TABLE "odd;name" (id int);\n')
+    assert statements == ['CREATE TABLE "odd;name" (id int);']
+
+def test_dollar_quoted_body():
+    sql = 'CREATE FUNCTION f() RETURNS trigger AS $$ BEGIN RETURN NEW; END; $$ LANGUAGE plpgsql;\n'
+    statements, _ = split(sql)
+    assert statements == [sql.strip()]
+
+def test_tagged_dollar_quote_containing_plain_dollar_quote():
+    sql = "CREATE FUNCTION f() RETURNS text AS $body$ SELECT $$;$$; $body$ LANGUAGE sql;\n"
+    statements, _ = split(sql)
+    assert statements == [sql.strip()]
+
+def test_dollar_sign_without_tag_is_not_a_quote():
+    statements, _ = split('SELECT $1;\nSELECT 2;\n')
+    assert statements == ['SELECT $1;', 'SELECT 2;']
+
+def test_line_comments_are_dropped():
+    statements, splitter = split('-- header; not a statement\nSELECT 1; -- trailing; comment\n-- only a comment\n')
+    assert statements == ['SELECT 1;']
+    assert splitter.empty
+
+def test_block_comment_hides_semicolons():
+    statements, _ = split('SELECT /* a; b */ 1;\n')
+    assert statements == ['SELECT /* a; b */ 1;']
+
+def test_statement_split_across_feeds():
+    statements, splitter = split("CREATE FUNCTION f() RETURNS text AS $$\n", "SELECT 'x;';\n", "$$ LANGUAGE sql;\n")
+    assert statements == ["CREATE FUNCTION f() RETURNS text AS $$\nSELECT 'x;';\n$$ LANGUAGE sql;"]
+    assert splitter.empty
+
+def test_quote_and_comment_state_carry_across_feeds():
+    statements, splitter = split("INSERT INTO t VALUES ('a;\n", "b');\n", '/* open;\n', 'still; open */ SELECT 1;\n')
+    assert statements == ["INSERT INTO t VALUES ('a;\nb');", '/* open;\nstill; open */ SELECT 1;']
+    assert splitter.empty
+
+def test_unfinished_statement_stays_buffered():
+    statements, splitter = split('SELECT 1')
+    assert statements == []
+    assert not splitter.empty
+
+def test_bare_semicolons_are_skipped():
+    statements, _ = split(';\n;\nSELECT 1;\n')
+    assert statements == ['SELECT 1;']
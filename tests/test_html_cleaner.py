@@ -0,0 +1,88 @@
+"""Golden tests comparing the lxml cleaner with the original BeautifulSoup pipeline"""
+import lxml.html
+import pytest
+from benchmarks.bench_html_cleaning import generate_quip_html, legacy_clean_quip_html, legacy_extract_title_from_html
+from html_cleaner import clean_quip_document
+
+def canonical(html_content):
+    """The parsed tree as nested tuples, so serializer differences (<br/> vs <br>, quoting) do not count"""
+    def node(element):
+        return (
+            element.tag,
+            sorted(element.attrib.items()),
+            (element.text or '').strip(),
+            [node(child) for child in element],
+            (element.tail or '').strip()
+        )
+    return node(lxml.html.document_fromstring(html_content))
+
+def legacy(html_content):
+    """What the original clean_quip_html and extract_title_from_html produced for a document"""
+    cleaned_html = legacy_clean_quip_html(html_content)
+    return cleaned_html, legacy_extract_title_from_html(cleaned_html)
+
+QUIP_DOCUMENTS = {
+    'full document': (
+        '<html><head><title>Plan</title><style>.quip-x { color: red; }</style></head><body>'
+        '<h1 class="quip-heading title" data-quip-id="h1">  Quarterly   plan </h1>\n'
+        '<p class="quip-paragraph" data-quip-id="p1">  First\n\n  paragraph <a href="https://quip.com/abc">link</a>  </p>\n'
+        '<ul class="quip-list checklist"><li class="quip-list-item">one</li>\n<li>two<br>three</li></ul>'
+        '<table class="quip-table"><tr data-quip-row="1"><td class="quip-cell" data-quip-col="0"> cell </td></tr></table>'
+        '<script>console.log("quip");</script></body></html>'
+    ),
+    'script tail after a sibling': '<html><body><p><b>bold</b> <script>var x = 1;</script>  kept   text</p></body></html>',
+    'script tail as first child': '<html><body><p><script>var x = 1;</script>  kept   text <i>after</i></p></body></html>',
+    'style between blocks': '<html><body><p>one</p>\n<style>p { }</style>\n<p>two</p></body></html>',
+    'nested removed tags': '<html><body><div><style>a</style><script>b</script> tail <span>s</span></div></body></html>',
+    'entities and comments': '<html><body><!-- quip --><p>a &amp; b &lt;c&gt;</p>\n<!-- end --> <p>d</p></body></html>',
+    'generated': generate_quip_html(8, seed=3),
+}
+
+@pytest.mark.parametrize('html_content', QUIP_DOCUMENTS.values(), ids=QUIP_DOCUMENTS.keys())
+def test_matches_legacy_cleaner(html_content):
+    cleaned_html, title = clean_quip_document(html_content)
+    legacy_html, legacy_title = legacy(html_content)
+    
+    assert canonical(cleaned_html) == canonical(legacy_html)
+    assert title == legacy_title
+
+def test_strips_xml_declaration():
+    body = '<html><head><title>Declared</title></head><body><p class="quip-p">text</p></body></html>'
+    cleaned_html, title = clean_quip_document('<?xml version="1.0" encoding="UTF-8"?>\n' + body)
+    
+    # lxml refuses str input with an encoding declaration; this used to fall back to the raw input
+    assert '<?xml' not in cleaned_html
+    assert 'quip-p' not in cleaned_html
+    assert canonical(cleaned_html) == canonical(legacy(body)[0])
+    assert title == 'Declared'
+
+def test_removed_tag_tails_are_normalized():
+    cleaned_html, _ = clean_quip_document('<p><b>x</b>\n  <script>s</script>\n\n  y   z</p><p><style>s</style>  a\n b</p>')
+    
+    assert '<p><b>x</b> y z</p>' in cleaned_html
+    assert '<p> a b</p>' in cleaned_html
+
+def test_wraps_fragments_in_html_and_body():
+    cleaned_html, title = clean_quip_document('<p class="quip-p keep">fragment</p>')
+    
+    assert cleaned_html == '<html><body><p class="keep">fragment</p></body></html>'
+    assert title is None
+
+@pytest.mark.parametrize('html_content, expected', [
+    ('<h2>Second</h2><h1> First </h1><title>Title</title>', 'First'),
+    ('<html><head><title> Title </title></head><body><h2>Second</h2></body></html>', 'Title'),
+    ('<h4>Fourth</h4><h3>Third</h3>', 'Third'),
+    ('<h1><span>Nested</span> heading</h1>', 'Nested heading'),
+    ('<p>No headings</p>', None),
+])
+def test_title_order(html_content, expected):
+    assert clean_quip_document(html_content)[1] == expected
+    assert legacy_extract_title_from_html(html_content) == expected
+
+def test_removes_only_quip_classes_and_attributes():
+    cleaned_html, _ = clean_quip_document(
+        '<div class="quip-a quip-b" data-quip-id="1" data-other="2" id="keep">'
+        '<span class="quip-a user quip-b">x</span></div>'
+    )
+    
+    assert '<div data-other="2" id="keep"><span class="user">x</span></div>' in cleaned_html
@@ -0,0 +1,119 @@
+"""Tests for the in-memory id index behind /api/search/suggest"""
+import random
+from array import array
+from types import SimpleNamespace
+import pytest
+import id_index
+import resolver
+from id_index import IdIndex, prefix_distance
+
+QUIP_FILE, QUIP_FOLDER, GOOGLE_FILE, GOOGLE_FOLDER = range(4)
+
+def make_index(tagged_ids):
+    pairs = sorted(tagged_ids)
+    return IdIndex([document_id for document_id, _ in pairs], array('b', (tag for _, tag in pairs)))
+
+def levenshtein(a, b):
+    previous = list(range(len(b) + 1))
+    for i, char in enumerate(a, 1):
+        current = [i]
+        for j in range(1, len(b) + 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != b[j - 1])))
+        previous = current
+    return previous[-1]
+
+@pytest.mark.parametrize('fragment, candidate, max_distance, expected', [
+    ('abc', 'abcdef', 2, 0),
+    ('abcdef', 'abcdef', 2, 0),
+    ('abx', 'abcdef', 2, 1),
+    ('abdef', 'abcdef', 2, 1),
+    ('abccdef', 'abcdef', 2, 1),
+    ('bacdef', 'abcdef', 2, 2),
+    ('abcde', 'abc', 2, 2),
+    ('', 'abc', 2, 0),
+    # Beyond the band the distance is cut off at max_distance + 1
+    ('axxxf', 'abcdef', 2, 3),
+    ('abd', 'abc', 0, 1),
+    ('zzzzzz', 'abcdef', 1, 2),
+    ('abcdefgh', 'abc', 2, 3),
+    ('abcdefgh', 'ab', 2, 3),
+])
+def test_prefix_distance(fragment, candidate, max_distance, expected):
+    assert prefix_distance(fragment, candidate, max_distance) == expected
+
+def test_prefix_distance_matches_full_levenshtein():
+    rng = random.Random(7)
+    for _ in range(2000):
+        fragment = ''.join(rng.choice('abc') for _ in range(rng.randint(0, 7)))
+        candidate = ''.join(rng.choice('abc') for _ in range(rng.randint(1, 9)))
+        max_distance = rng.randint(0, 3)
+        # The distance to the closest prefix, capped just above the band
+        expected = min(min(levenshtein(fragment, candidate[:end]) for end in range(len(candidate) + 1)), max_distance + 1)
+        assert prefix_distance(fragment, candidate, max_distance) == expected, (fragment, candidate, max_distance)
+
+@pytest.fixture
+def index():
+    return make_index([
+        ('abcdef01', QUIP_FILE), ('abcdef02', QUIP_FILE), ('abcdef02', QUIP_FOLDER),
+        ('abcdeg01', QUIP_FILE), ('abcxef01', QUIP_FOLDER), ('abdef001', QUIP_FILE),
+        ('abcdef9G', GOOGLE_FILE), ('abxxxx01', GOOGLE_FOLDER), ('zzzz0001', QUIP_FILE),
+    ])
+
+def test_suggest_ranks_prefixes_then_typos_by_distance_and_id(index):
+    assert index.suggest('abcdef0', max_typos=2) == [
+        ('abcdef01', 'quip', 0),
+        ('abcdef02', 'quip', 0),
+        ('abcdef9G', 'google', 1),
+        ('abcdeg01', 'quip', 1),
+        ('abcxef01', 'quip', 1),
+        ('abdef001', 'quip', 1),
+    ]
+
+def test_suggest_filters_by_search_type(index):
+    assert index.suggest('abcdef0', 'google') == [('abcdef9G', 'google', 1)]
+    assert [suggestion[0] for suggestion in index.suggest('abcdef0', 'quip')] == [
+        'abcdef01', 'abcdef02', 'abcdeg01', 'abcxef01', 'abdef001'
+    ]
+
+def test_suggest_limit_prefers_prefixes(index):
+    assert index.suggest('abcdef', limit=2) == [('abcdef01', 'quip', 0), ('abcdef02', 'quip', 0)]
+    assert index.suggest('abcdef0', limit=4)[2:] == [('abcdef9G', 'google', 1), ('abcdeg01', 'quip', 1)]
+
+def test_suggest_respects_max_typos(index):
+    assert index.suggest('abcdxx0', max_typos=1) == []
+    assert index.suggest('abcdxx0', max_typos=2)[0][2] == 2
+
+def test_suggest_scan_limit_bounds_the_typo_block():
+    index = make_index([(f'abc{number:05}', QUIP_FILE) for number in range(1, 6)])
+    
+    # The typo is in the third character, so only the 5-id "ab" block holds the candidates
+    assert [suggestion[0] for suggestion in index.suggest('abd0000', scan_limit=5)] == [
+        f'abc{number:05}' for number in range(1, 6)
+    ]
+    assert index.suggest('abd0000', scan_limit=4) == []
+    # Exact prefixes never depend on the scan limit
+    assert len(index.suggest('abc0000', scan_limit=1)) == 5
+
+def test_suggest_route_orders_and_resolves_suggestions(client, index, monkeypatch):
+    monkeypatch.setattr(id_index, 'get_index', lambda: index)
+    
+    def resolve_documents(document_ids, id_type):
+        return {
+            document_id: SimpleNamespace(
+                kind='file', quip_id=document_id if id_type == 'quip' else None,
+                google_drive_id=document_id if id_type == 'google' else None, name=f'Name {document_id}'
+            )
+            for document_id in document_ids if document_id != 'abcxef01'
+        }
+    monkeypatch.setattr(resolver, 'resolve_documents', resolve_documents)
+    
+    data = client.get('/api/search/suggest?q=abcdef0&limit=5').get_json()
+    
+    # Ids the resolver no longer knows are dropped rather than shown without a name
+    assert [(s['id'], s['search_type'], s['prefix_match'], s['typos']) for s in data['suggestions']] == [
+        ('abcdef01', 'quip', True, 0),
+        ('abcdef02', 'quip', True, 0),
+        ('abcdef9G', 'google', False, 1),
+        ('abcdeg01', 'quip', False, 1),
+    ]
+    assert data['suggestions'][2]['google_drive_id'] == 'abcdef9G'
@@ -0,0 +1,108 @@
+"""Tests for extracting inline images into the content-addressed store"""
+import base64
+import hashlib
+import os
+import image_store
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'\0' * 32
+
+def data_uri(data, subtype='png'):
+    return f'data:image/{subtype};base64,{base64.b64encode(data).decode("ascii")}'
+
+def stored_name(data, extension='png'):
+    return f'{hashlib.sha256(data).hexdigest()}.{extension}'
+
+def test_extracts_png_into_sharded_path(app):
+    html, extracted = image_store.extract_images(f'<img src="{data_uri(PNG)}">', lambda filename: f'/img/{filename}')
+    
+    filename = stored_name(PNG)
+    assert extracted == 1
+    assert html == f'<img src="/img/{filename}">'
+    
+    path = image_store.image_path(filename)
+    assert path == os.path.join(os.path.abspath(app.config['IMAGE_STORE_DIR']), filename[:2], filename)
+    with open(path, 'rb') as image_file:
+        assert image_file.read() == PNG
+
+def test_same_image_is_stored_once(app):
+    html = f'<img src="{data_uri(PNG)}"><img src=\'{data_uri(PNG)}\'>'
+    html, extracted = image_store.extract_images(html, lambda filename: filename)
+    
+    assert extracted == 2
+    assert html == f'<img src="{stored_name(PNG)}"><img src=\'{stored_name(PNG)}\'>'
+    assert len(image_store._entries(app.config['IMAGE_STORE_DIR'])) == 1
+
+def test_base64_wrapped_over_lines(app):
+    encoded = base64.b64encode(PNG).decode('ascii')
+    wrapped = '\n'.join(encoded[i:i + 16] for i in range(0, len(encoded), 16))
+    html, extracted = image_store.extract_images(f'<img src="data:image/png;base64,{wrapped}">', lambda filename: filename)
+    
+    assert extracted == 1
+    assert html == f'<img src="{stored_name(PNG)}">'
+
+def test_svg_stays_inline(app):
+    svg = data_uri(b'<svg xmlns="http://www.w3.org/2000/svg"><script>alert(1)</script></svg>', 'svg+xml')
+    html = f'<img src="{svg}">'
+    
+    assert image_store.extract_images(html, lambda filename: filename) == (html, 0)
+    assert not os.path.exists(app.config['IMAGE_STORE_DIR'])
+
+def test_invalid_base64_stays_inline(app):
+    html = '<img src="data:image/png;base64,not*base64">'
+    assert image_store.extract_images(html, lambda filename: filename) == (html, 0)
+
+def test_image_filename_only_matches_store_names():
+    name = stored_name(PNG)
+    assert image_store.IMAGE_FILENAME.match(name)
+    
+    for rejected in [
+        '../' + name,
+        name.upper(),
+        name[:-4] + '.svg',
+        name + '.png',
+        name[:-5] + '.png',
+        'passwd',
+        '..%2F..%2Fetc%2Fpasswd',
+    ]:
+        assert not image_store.IMAGE_FILENAME.match(rejected), rejected
+
+def test_route_serves_stored_images_only(app, client):
+    image_store.extract_images(f'<img src="{data_uri(PNG)}">', lambda filename: filename)
+    
+    response = client.get(f'/api/images/{stored_name(PNG)}')
+    assert response.status_code == 200
+    assert response.data == PNG
+    assert response.headers['X-Content-Type-Options'] == 'nosniff'
+    assert response.headers['Content-Security-Policy'] == 'sandbox'
+    response.close()
+    
+    # A file in the store directory that store_image did not name is not served
+    with open(os.path.join(app.config['IMAGE_STORE_DIR'], 'passwd'), 'w') as other_file:
+        other_file.write('secret')
+    assert client.get('/api/images/passwd').status_code == 404
+    assert client.get('/api/images/..%2Fpasswd').status_code == 404
+    assert client.get(f'/api/images/{stored_name(b"missing")}').status_code == 404
+
+def test_evicts_least_recently_used_first(app):
+    images = [bytes([i]) * 100 for i in range(4)]
+    paths = []
+    for age, data in enumerate(images):
+        path = image_store.image_path(image_store.store_image(data, 'png'))
+        # Oldest first: the first image was used longest ago
+        os.utime(path, (1000 + age, 1000 + age))
+        paths.append(path)
+    
+    # Storing an image again counts as using it
+    image_store.store_image(images[0], 'png')
+    
+    assert image_store.evict(250) == 2
+    assert [os.path.exists(path) for path in paths] == [True, False, False, True]
+
+def test_store_checks_size_limit_after_a_tenth_is_written(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'IMAGE_STORE_MAX_BYTES', 1000)
+    monkeypatch.setattr(image_store, '_stored_since_evict', [0])
+    
+    for i in range(30):
+        image_store.store_image(bytes([i]) * 100, 'png')
+    
+    assert sum(size for _, size, _ in image_store._entries(app.config['IMAGE_STORE_DIR'])) <= 1000
@@ -0,0 +1,76 @@
+"""Tests for rewriting quip.com links to the migrated Google Drive documents"""
+import pytest
+from link_rewriter import LinkMap
+
+THREAD = 'AbCdEfGh1234'
+SECRET = 'XyZ987abcd'
+FOLDER = 'Fold3r0001'
+
+DOCUMENT_URL = 'https://docs.google.com/document/d/drive-thread/edit'
+SECRET_URL = 'https://docs.google.com/document/d/drive-secret/edit'
+FOLDER_URL = 'https://drive.google.com/drive/folders/drive-folder'
+
+@pytest.fixture
+def link_map():
+    return LinkMap({THREAD: 'drive-thread', SECRET: 'drive-secret', FOLDER: 'drive-folder'}, {FOLDER}, 'test')
+
+def rewrite_href(link_map, href):
+    html_content, rewritten, unresolved = link_map.rewrite(f'<a href="{href}">link</a>')
+    return html_content[len('<a href="'):-len('">link</a>')], rewritten, unresolved
+
+@pytest.mark.parametrize('href, expected', [
+    (f'https://quip.com/{THREAD}', DOCUMENT_URL),
+    (f'http://quip.com/{THREAD}', DOCUMENT_URL),
+    (f'//quip.com/{THREAD}', DOCUMENT_URL),
+    (f'https://quip.com/{THREAD}/', DOCUMENT_URL),
+    (f'https://quip.com/{THREAD}/Quarterly-Migration-Plan', DOCUMENT_URL),
+    (f'https://quip.com/{THREAD}?line=temp:C:abc123', DOCUMENT_URL),
+    (f'https://quip.com/{THREAD}#temp:C:abc123', DOCUMENT_URL),
+    (f'https://quip.com/{THREAD}/Plan-v2?a=1&amp;b=2#section', DOCUMENT_URL),
+    (f'https://example.quip.com/{THREAD}', DOCUMENT_URL),
+    (f'https://my-company.eu.quip.com/{THREAD}/Plan', DOCUMENT_URL),
+    (f'https://quip.com/{SECRET}/Shared-Doc', SECRET_URL),
+    (f'https://quip.com/{FOLDER}', FOLDER_URL),
+    (f'https://quip.com/{FOLDER}/team-folder', FOLDER_URL),
+])
+def test_rewrites_migrated_links(link_map, href, expected):
+    assert rewrite_href(link_map, href) == (expected, 1, 0)
+
+@pytest.mark.parametrize('href, unresolved', [
+    # Not yet migrated: kept so the link still works, and counted
+    ('https://quip.com/Unknown12345', 1),
+    ('https://quip.com/Unknown12345/Some-Title?x=1#y', 1),
+    # Longer than a thread id, or not a quip.com link
+    (f'https://quip.com/{THREAD}9', 0),
+    (f'https://notquip.com/{THREAD}', 0),
+    (f'https://quip.com.example.com/{THREAD}', 0),
+    (f'https://example.com/quip.com/{THREAD}', 0),
+    (f'https://quip.com/blog/{THREAD}', 0),
+    # Blob and data URLs are never thread links
+    (f'blob:https://quip.com/{THREAD}-4f2a-9c1e-2b7d5e8a0f31', 0),
+    (f'blob:https://example.quip.com/{THREAD}', 0),
+    (f'data:text/plain;charset=utf-8,quip.com%2F{THREAD}', 0),
+    ('data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJ', 0),
+])
+def test_leaves_other_links_untouched(link_map, href, unresolved):
+    assert rewrite_href(link_map, href) == (href, 0, unresolved)
+
+def test_rewrites_every_link_in_one_pass(link_map):
+    html_content = (
+        f'<p>See <a href="https://quip.com/{THREAD}/Plan">the plan</a>, '
+        f'https://quip.com/{FOLDER} and <a href="https://quip.com/Unknown12345">this</a>.</p>'
+        f'<img src="data:image/png;base64,AAAA">'
+    )
+    
+    rewritten_html, rewritten, unresolved = link_map.rewrite(html_content)
+    
+    assert rewritten_html == (
+        f'<p>See <a href="{DOCUMENT_URL}">the plan</a>, '
+        f'{FOLDER_URL} and <a href="https://quip.com/Unknown12345">this</a>.</p>'
+        f'<img src="data:image/png;base64,AAAA">'
+    )
+    assert (rewritten, unresolved) == (2, 1)
+
+def test_url_for_unknown_id(link_map):
+    assert link_map.url_for('Unknown12345') is None
+    assert link_map.url_for(THREAD) == DOCUMENT_URL
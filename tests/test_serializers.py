@@ -0,0 +1,55 @@
+"""Tests pinning the JSON every API route writes through serializers.json_response"""
+from datetime import date, datetime
+from decimal import Decimal
+import pytest
+import serializers
+
+PAYLOAD = {
+    'status': 'success',
+    'when': datetime(2024, 5, 6, 7, 8, 9),
+    'micro': datetime(2024, 5, 6, 7, 8, 9, 120000),
+    'day': date(2024, 5, 6),
+    'size': Decimal('12.50'),
+    'name': 'Déjà vu ✓',
+    'counts': {1: 'one'},
+    'items': [1, 2.5, None, True],
+}
+
+EXPECTED = (
+    '{"status":"success","when":"2024-05-06T07:08:09","micro":"2024-05-06T07:08:09.120000",'
+    '"day":"2024-05-06","size":"12.50","name":"Déjà vu ✓","counts":{"1":"one"},"items":[1,2.5,null,true]}'
+).encode('utf-8')
+
+@pytest.fixture(params=['orjson', 'json'])
+def encoder(request, monkeypatch):
+    """Run a test with orjson and again with the standard library fallback"""
+    if request.param == 'orjson':
+        if serializers.orjson is None:
+            pytest.skip('orjson is not installed')
+    else:
+        monkeypatch.setattr(serializers, 'orjson', None)
+    return request.param
+
+def test_dumps_format(encoder):
+    # Compact, in insertion order, ISO 8601 datetimes and Decimals as strings, whichever encoder runs
+    assert serializers.dumps(PAYLOAD) == EXPECTED
+
+def test_dumps_rejects_unknown_types(encoder):
+    with pytest.raises(TypeError):
+        serializers.dumps({'value': object()})
+
+def test_json_response(app, encoder):
+    response = serializers.json_response(PAYLOAD, status=201)
+    
+    assert response.status_code == 201
+    assert response.mimetype == 'application/json'
+    assert response.get_data() == EXPECTED
+
+def test_routes_answer_through_json_response(client, encoder):
+    # A success and an error from routes that used to go through jsonify
+    assert client.get('/api/data').get_data() == b'{"message":"GET request received","data":[]}'
+    
+    response = client.get('/api/search/suggest?q=abc&search_type=other')
+    assert response.status_code == 400
+    assert response.mimetype == 'application/json'
+    assert response.get_data() == b'{"status":"error","message":"search_type must be \\"quip\\", \\"google\\" or \\"any\\""}'